@@ -0,0 +1,44 @@
+"""Add listing and foreign key indexes
+
+Revision ID: 2df3de713ad4
+Revises: 6b1bdfcd2d97
+Create Date: 2026-10-18 09:40:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2df3de713ad4'
+down_revision: Union[str, None] = '6b1bdfcd2d97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    ('ix_users_created_at_id', 'users', ['created_at', 'id']),
+    ('ix_blog_posts_created_at_id', 'blog_posts', ['created_at', 'id']),
+    ('ix_blog_posts_author_id_created_at', 'blog_posts', ['author_id', 'created_at']),
+    ('ix_comments_blog_post_id_created_at_id', 'comments', ['blog_post_id', 'created_at', 'id']),
+    ('ix_comments_user_id_created_at', 'comments', ['user_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so each
+    # index is built in autocommit mode and does not lock out writes. A failed
+    # concurrent build leaves an INVALID index behind; drop it before retrying.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table,
+                          postgresql_concurrently=True, if_exists=True)
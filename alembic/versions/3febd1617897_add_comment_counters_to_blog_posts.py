@@ -0,0 +1,39 @@
+"""Add comment counters to blog posts
+
+Revision ID: 3febd1617897
+Revises: 837a50212817
+Create Date: 2026-10-18 11:20:31.774052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3febd1617897'
+down_revision: Union[str, None] = '837a50212817'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('blog_posts', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('blog_posts', sa.Column('last_comment_at', sa.DateTime(), nullable=True))
+
+    # Backfill in one pass over comments. On very large tables skip this and
+    # run `flask repair-comment-counts`, which commits in small batches.
+    op.execute("""
+        UPDATE blog_posts SET comment_count = counts.total, last_comment_at = counts.latest
+        FROM (
+            SELECT blog_post_id, count(*) AS total, max(created_at) AS latest
+            FROM comments GROUP BY blog_post_id
+        ) AS counts
+        WHERE counts.blog_post_id = blog_posts.id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_column('blog_posts', 'last_comment_at')
+    op.drop_column('blog_posts', 'comment_count')
@@ -0,0 +1,47 @@
+"""Add case-insensitive unique indexes on usernames and emails
+
+Revision ID: 79e2eaf44494
+Revises: f424ca23981e
+Create Date: 2026-10-18 17:26:48.904213
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '79e2eaf44494'
+down_revision: Union[str, None] = 'f424ca23981e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_users_lower_username', 'username'),
+    ('ix_users_lower_email', 'email'),
+]
+
+
+def upgrade() -> None:
+    # Accounts differing only in case would make the build fail (and leave an
+    # INVALID index behind), so refuse up front and name them
+    connection = op.get_bind()
+    for _, column in INDEXES:
+        clashes = connection.execute(sa.text(
+            f'SELECT lower({column}) FROM users GROUP BY lower({column}) HAVING count(*) > 1 LIMIT 10'
+        )).scalars().all()
+        if clashes:
+            raise RuntimeError(f'Rename users whose {column} differs only in case first: {", ".join(clashes)}')
+
+    # Built without locking out writes, as in 2df3de713ad4
+    with op.get_context().autocommit_block():
+        for name, column in INDEXES:
+            op.create_index(name, 'users', [sa.text(f'lower({column})')], unique=True,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='users', postgresql_concurrently=True, if_exists=True)
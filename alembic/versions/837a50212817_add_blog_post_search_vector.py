@@ -0,0 +1,50 @@
+"""Add blog post search vector
+
+Revision ID: 837a50212817
+Revises: 17c635d60c81
+Create Date: 2026-10-18 10:48:05.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '837a50212817'
+down_revision: Union[str, None] = '17c635d60c81'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    # Adding a stored generated column rewrites blog_posts under an exclusive
+    # lock; schedule this migration for a quiet window on large tables.
+    op.execute(
+        f"ALTER TABLE blog_posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_blog_posts_search_vector "
+            "ON blog_posts USING GIN (search_vector)"
+        )
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_blog_posts_search_vector")
+    op.drop_column('blog_posts', 'search_vector')
@@ -0,0 +1,86 @@
+"""Add comment threads
+
+Revision ID: f424ca23981e
+Revises: 1e4d01dbba20
+Create Date: 2026-10-18 16:41:07.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f424ca23981e'
+down_revision: Union[str, None] = '1e4d01dbba20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+
+INDEXES = [
+    ('ix_comments_path', ['path'], None),
+    ('ix_comments_parent_id', ['parent_id'], None),
+    # Keyset paging over the threads of a post
+    ('ix_comments_top_level', ['blog_post_id', 'created_at', 'id'], sa.text('parent_id IS NULL')),
+]
+
+
+def upgrade() -> None:
+    path_type = sa.Text().with_variant(postgresql.TEXT(collation='C'), 'postgresql')
+    op.add_column('comments', sa.Column('parent_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.add_column('comments', sa.Column('depth', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('comments', sa.Column('path', path_type, nullable=True))
+    op.create_foreign_key('comments_parent_id_fkey', 'comments', 'comments', ['parent_id'], ['id'])
+
+    # Every existing comment starts a thread of its own
+    comments = sa.table('comments', sa.column('id', postgresql.UUID(as_uuid=True)), sa.column('path', path_type))
+    own_thread = sa.func.replace(sa.cast(comments.c.id, sa.Text), '-', '') + '/'
+
+    with op.get_context().autocommit_block():
+        if context.is_offline_mode():
+            # A generated --sql script can't read ids back to batch on
+            op.execute(comments.update().values(path=own_thread))
+        else:
+            # Id-range batches, each committed on its own as in 1e4d01dbba20,
+            # so no statement rewrites or locks the whole table
+            connection = op.get_bind()
+            last_id = None
+            while True:
+                query = sa.select(comments.c.id).order_by(comments.c.id).limit(BATCH_SIZE)
+                if last_id is not None:
+                    query = query.where(comments.c.id > last_id)
+                ids = connection.scalars(query).all()
+                if not ids:
+                    break
+                batch = comments.update().where(comments.c.id <= ids[-1]).values(path=own_thread)
+                if last_id is not None:
+                    batch = batch.where(comments.c.id > last_id)
+                connection.execute(batch)
+                last_id = ids[-1]
+            # Comments written by the previous release while the batches ran
+            connection.execute(comments.update().where(comments.c.path.is_(None)).values(path=own_thread))
+
+        # SET NOT NULL skips its locked full-table scan when a validated CHECK
+        # already proves it, and VALIDATE doesn't block reads or writes
+        op.execute('ALTER TABLE comments ADD CONSTRAINT comments_path_not_null CHECK (path IS NOT NULL) NOT VALID')
+        op.execute('ALTER TABLE comments VALIDATE CONSTRAINT comments_path_not_null')
+        op.alter_column('comments', 'path', existing_type=path_type, nullable=False)
+        op.drop_constraint('comments_path_not_null', 'comments', type_='check')
+
+        # Built without locking out writes, as in 2df3de713ad4
+        for name, columns, where in INDEXES:
+            op.create_index(name, 'comments', columns, unique=False, postgresql_where=where,
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='comments', postgresql_concurrently=True, if_exists=True)
+    op.drop_constraint('comments_parent_id_fkey', 'comments', type_='foreignkey')
+    op.drop_column('comments', 'path')
+    op.drop_column('comments', 'depth')
+    op.drop_column('comments', 'parent_id')
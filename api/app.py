@@ -2,6 +2,13 @@ from flask import Flask
 from dotenv import load_dotenv
 import os
 from api.models.blogmodels import db
+from api.utils.cache import model_cache
+from api.utils.passwords import password_hasher
+from api.utils.dbpool import engine_options, init_pool_stats
+from api.utils.replicas import replica_router
+from api.utils.greenio import init_green_db
+from api.utils.profiling import sql_profiler
+from api.utils.metrics import metrics
 from api.config import Config, TestConfig
 from flask_jwt_extended import JWTManager
 
@@ -18,22 +25,63 @@ if os.getenv('FLASK_ENV') == 'testing':
 else:
     app.config.from_object(Config)
 
+# Optionally encode responses with orjson instead of the stdlib json module
+if app.config.get('JSON_PROVIDER') == 'orjson':
+    from api.utils.fastjson import OrjsonProvider
+    app.json = OrjsonProvider(app)
+
+# Cooperative psycopg2 I/O under gevent workers
+init_green_db(app)
+
+# Size and instrument the connection pool from the DB_* settings
+app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+init_pool_stats(app)
+
 # Initialize SQLAlchemy with the app
 db.init_app(app)
 
+# Count queries and database time per request when SQL_PROFILING is on
+sql_profiler.init_app(app)
+
+# Request, error and pool metrics for Prometheus when METRICS_ENABLED is on
+metrics.init_app(app)
+
+# Cache single-object lookups in front of the database
+model_cache.init_app(app)
+
+# Send read-only GETs to DATABASE_REPLICA_URLS, pinning recent writers to the primary
+replica_router.init_app(app)
+
+# Hash passwords in a bounded thread pool that cooperates with gevent
+password_hasher.init_app(app)
+
 # Set up JWT
 app.config['JWT_SECRET_KEY'] = os.getenv('SECRET_KEY')
 jwt = JWTManager(app)
 
+# Put the user id and role into access tokens
+from api.utils.auth import init_jwt
+
+init_jwt(jwt)
+
 
 # Import and register blueprints
 from api.routes.blogroutes import blog_bp
 from api.routes.usersroutes import user_bp
 from api.routes.commentroutes import comments_bp
+from api.routes.statsroutes import stats_bp
+from api.routes.metricsroutes import metrics_bp
 
 app.register_blueprint(blog_bp)
 app.register_blueprint(user_bp)
 app.register_blueprint(comments_bp)
+app.register_blueprint(stats_bp)
+app.register_blueprint(metrics_bp)
+
+# Register CLI commands (flask export ...)
+from api.commands import register_commands
+
+register_commands(app)
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,416 @@
+"""Optional ASGI entry point on an async SQLAlchemy engine.
+
+    uvicorn api.asgi:app --workers 4
+
+Serves a subset of the Flask app (api.app:app) under the same URLs and
+tokens: listing and getting posts, comments and users with page/per_page or
+cursor paging, creating posts and comments (replies included), and /login.
+For those, response bodies match the Flask app's. Totals are always exact
+COUNT(*)s, and there are no ETags. Query parameters of the Flask routes that
+aren't implemented here (ids, fields, include, count, depth) are rejected
+with a 400 rather than ignored; send such requests to the Flask app.
+
+Configuration, models, serializers, keyset cursors, page metadata, token
+checks and password hashing are shared with it, and errors raised by the
+token checks or by missing routes and rows are answered by the Flask app's
+own error handlers, so those responses match too. Only the database driver
+differs: postgresql+asyncpg in production, sqlite+aiosqlite in tests.
+
+Needs `starlette` and `uvicorn` plus the async driver, none of which the
+WSGI deployment requires.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import func, or_, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.responses import Response
+from starlette.routing import Route
+from flask_jwt_extended import create_access_token, get_jwt, verify_jwt_in_request
+from werkzeug.exceptions import default_exceptions, InternalServerError
+from api.app import app as flask_app
+from api.models.blogmodels import BlogPost, Comment, User
+from api.routes.commentroutes import COMMENT_LIST_FIELDS, reply_error
+from api.schemas.serializers import post_serializer, comment_serializer, user_serializer, user_detail_serializer
+from api.utils.cache import model_cache, to_uuid
+from api.utils.counters import comments_added_statement
+from api.utils.counting import Page
+from api.utils.dbpool import engine_options
+from api.utils.pagination import keyset_clauses, split_page, InvalidCursor
+from api.utils.passwords import password_hasher
+
+ASYNC_DRIVERS = {'postgresql': 'postgresql+asyncpg', 'sqlite': 'sqlite+aiosqlite'}
+# Query parameters of the Flask routes this app doesn't implement
+FLASK_ONLY_PARAMETERS = ('ids', 'fields', 'include', 'count', 'depth')
+
+
+def async_url(url):
+    """The DATABASE_URL with its driver swapped for the asyncio one."""
+    url = make_url(url)
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()])
+
+
+def async_engine_options(config):
+    """engine_options() for create_async_engine.
+
+    The pool sizes carry over as they are, on the asyncio queue pool (the
+    instrumented TimedQueuePool is sync only, and aiosqlite would otherwise
+    default to a NullPool, which takes no sizes). asyncpg takes server
+    settings instead of libpq options.
+    """
+    options = engine_options(config)
+    if options.pop('poolclass', None):
+        options['poolclass'] = AsyncAdaptedQueuePool
+    if 'connect_args' in options:
+        options['connect_args'] = {
+            'server_settings': {'statement_timeout': str(int(config['DB_STATEMENT_TIMEOUT_MS']))}
+        }
+    return options
+
+
+engine = create_async_engine(async_url(flask_app.config['SQLALCHEMY_DATABASE_URI']),
+                             **async_engine_options(flask_app.config))
+# Rows are serialized after commit, so keep their loaded attributes
+Session = async_sessionmaker(engine, expire_on_commit=False)
+
+
+def flask_error_response(exc):
+    """The response the Flask app's error handlers give for `exc`."""
+    with flask_app.test_request_context():
+        response = flask_app.make_response(flask_app.handle_user_exception(exc))
+    return Response(response.get_data(), status_code=response.status_code,
+                    headers={'Content-Type': response.content_type})
+
+
+def json_response(data, status_code=200):
+    # Encode with the Flask app's provider (JSON_PROVIDER) so bodies match byte for byte
+    return Response(flask_app.json.dumps(data), status_code=status_code, media_type='application/json')
+
+
+def int_arg(request, name, default):
+    # Like request.args.get(name, default, type=int): malformed values fall back to the default
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+
+def page_arguments(request):
+    """(page, per_page) from the query string, or None when either is not positive."""
+    page = int_arg(request, 'page', 1)
+    per_page = int_arg(request, 'per_page', 10)
+    if page < 1 or per_page < 1:
+        return None
+    return page, min(per_page, flask_app.config.get('MAX_PER_PAGE', 100))
+
+
+async def json_body(request):
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def flask_parameters_rejected(handler):
+    """Answer 400 to query parameters only the Flask app implements, instead of ignoring them."""
+    async def wrapper(request):
+        unsupported = sorted(set(request.query_params) & set(FLASK_ONLY_PARAMETERS))
+        if unsupported:
+            return json_response({'error': f'Not supported by the ASGI app: {", ".join(unsupported)}'}, 400)
+        return await handler(request)
+    return wrapper
+
+
+def jwt_required(handler):
+    """Check the access token with flask_jwt_extended, as @jwt_required() does.
+
+    No user loader is registered, so this runs no query. Rejections (401
+    for a missing or expired token, 422 for a malformed one) come from the
+    Flask app's error handlers.
+    """
+    async def wrapper(request):
+        authorization = request.headers.get('authorization')
+        with flask_app.test_request_context(headers={'Authorization': authorization} if authorization else {}):
+            try:
+                verify_jwt_in_request()
+            except Exception as e:
+                return flask_error_response(e)
+            request.state.jwt = get_jwt()
+        return await handler(request)
+    return wrapper
+
+
+async def get_or_404(session, model, object_id):
+    obj = await session.get(model, to_uuid(object_id)) if to_uuid(object_id) else None
+    if obj is None:
+        raise HTTPException(404)
+    return obj
+
+
+async def keyset_page(session, statement, model, request, per_page, descending=True):
+    """Cursor mode of the listings: the page after ?cursor= and the next cursor."""
+    filters, order_by = keyset_clauses(model, request.query_params['cursor'], descending)
+    rows = (await session.scalars(statement.where(*filters).order_by(*order_by).limit(per_page + 1))).all()
+    return split_page(rows, per_page)
+
+
+async def offset_page(session, statement, page, per_page):
+    """`page` with an exact total, like counting.paginate() with count=exact."""
+    total = await session.scalar(select(func.count()).select_from(statement.subquery()))
+    rows = (await session.scalars(statement.limit(per_page).offset((page - 1) * per_page))).all()
+    return Page(rows, page, per_page, total, page * per_page < total)
+
+
+def page_links(page):
+    """Page metadata of the post and user listings."""
+    return {
+        'total': page.total,
+        'pages': page.pages,
+        'current_page': page.page,
+        'next_page': page.next_page,
+        'prev_page': page.prev_page
+    }
+
+
+# Fetch blog posts, by page or by cursor
+@jwt_required
+@flask_parameters_rejected
+async def get_blog_posts(request):
+    arguments = page_arguments(request)
+    if arguments is None:
+        return json_response({'error': 'Invalid pagination parameters'}, 400)
+    page, per_page = arguments
+
+    async with Session() as session:
+        if 'cursor' in request.query_params:
+            try:
+                posts, next_cursor = await keyset_page(session, select(BlogPost), BlogPost, request, per_page)
+            except InvalidCursor:
+                return json_response({'error': 'Invalid cursor'}, 400)
+            return json_response({'posts': post_serializer.dump_many(posts), 'per_page': per_page,
+                                  'next_cursor': next_cursor})
+
+        posts = await offset_page(session, select(BlogPost), page, per_page)
+        return json_response({'posts': post_serializer.dump_many(posts.items), **page_links(posts)})
+
+
+# Get a blog post
+@jwt_required
+@flask_parameters_rejected
+async def get_blog_post(request):
+    async with Session() as session:
+        post = await get_or_404(session, BlogPost, request.path_params['post_id'])
+        return json_response(post_serializer.dump(post))
+
+
+# Create a blog post
+@jwt_required
+async def create_blog_post(request):
+    data = await json_body(request)
+    title = data.get('title')
+    content = data.get('content')
+    author_id = data.get('author_id')
+
+    if not title or not content or not author_id:
+        return json_response({'error': 'Missing required fields'}, 400)
+
+    async with Session() as session:
+        user = await session.get(User, to_uuid(author_id)) if to_uuid(author_id) else None
+        if not user:
+            return json_response({'error': 'User not found'}, 404)
+
+        new_post = BlogPost(title=title, content=content, author_id=user.id)
+        session.add(new_post)
+        await session.commit()
+        return json_response({'message': 'Blog post created successfully',
+                              'post': post_serializer.dump(new_post, ('id', 'title', 'content', 'author_id'))},
+                             201)
+
+
+# Get the comments of a blog post, oldest first
+@jwt_required
+@flask_parameters_rejected
+async def get_comments_for_blog_post(request):
+    async with Session() as session:
+        post = await get_or_404(session, BlogPost, request.path_params['post_id'])
+
+        arguments = page_arguments(request)
+        if arguments is None:
+            return json_response({'error': 'Page number and per_page must be positive integers'}, 400)
+        page, per_page = arguments
+
+        statement = select(Comment).where(Comment.blog_post_id == post.id)
+        if 'cursor' in request.query_params:
+            try:
+                comments, next_cursor = await keyset_page(session, statement, Comment, request, per_page,
+                                                          descending=False)
+            except InvalidCursor:
+                return json_response({'error': 'Invalid cursor'}, 400)
+            return json_response({
+                'post_id': str(post.id),
+                'comments': comment_serializer.dump_many(comments, COMMENT_LIST_FIELDS),
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            })
+
+        comments = await offset_page(session, statement, page, per_page)
+        return json_response({
+            'post_id': str(post.id),
+            'comments': comment_serializer.dump_many(comments.items, COMMENT_LIST_FIELDS),
+            'page': page,
+            'per_page': per_page,
+            'total_comments': comments.total,
+            'total_pages': comments.pages,
+            'next_page': comments.next_page
+        })
+
+
+# Get a comment
+@jwt_required
+@flask_parameters_rejected
+async def get_comment(request):
+    async with Session() as session:
+        comment = await get_or_404(session, Comment, request.path_params['comment_id'])
+        return json_response(comment_serializer.dump(comment))
+
+
+# Create a comment
+@jwt_required
+async def create_comment(request):
+    data = await json_body(request)
+    blog_post_id = data.get('blog_post_id')
+    user_id = data.get('user_id')
+    parent_id = data.get('parent_id')
+    comment_text = data.get('comment')
+
+    if not blog_post_id or not user_id or not comment_text:
+        return json_response({'error': 'Missing required fields'}, 400)
+
+    async with Session() as session:
+        post = await session.get(BlogPost, to_uuid(blog_post_id)) if to_uuid(blog_post_id) else None
+        user = await session.get(User, to_uuid(user_id)) if to_uuid(user_id) else None
+
+        if not post:
+            return json_response({'error': 'Blog post not found'}, 404)
+        if not user:
+            return json_response({'error': 'User not found'}, 404)
+
+        parent = None
+        if parent_id:
+            parent = await session.get(Comment, to_uuid(parent_id)) if to_uuid(parent_id) else None
+            error = reply_error(parent, post.id, flask_app.config.get('COMMENT_MAX_DEPTH', 8))
+            if error:
+                message, status = error
+                return json_response({'error': message}, status)
+
+        new_comment = Comment(blog_post_id=post.id, user_id=user.id, comment=comment_text)
+        new_comment.place_in_thread(parent)
+        session.add(new_comment)
+        await session.execute(comments_added_statement(post.id))
+        await session.commit()
+        # created_at is a server default
+        await session.refresh(new_comment, ['created_at'])
+
+    # The WSGI workers may hold the post, with its old counters, in a shared cache
+    model_cache.invalidate(BlogPost, post.id)
+    return json_response({'message': 'Comment added successfully',
+                          'comment': comment_serializer.dump(new_comment)}, 201)
+
+
+# Fetch users, by page or by cursor
+@jwt_required
+@flask_parameters_rejected
+async def get_users(request):
+    arguments = page_arguments(request)
+    if arguments is None:
+        return json_response({'error': 'Invalid pagination parameters'}, 400)
+    page, per_page = arguments
+
+    async with Session() as session:
+        if 'cursor' in request.query_params:
+            try:
+                users, next_cursor = await keyset_page(session, select(User), User, request, per_page)
+            except InvalidCursor:
+                return json_response({'error': 'Invalid cursor'}, 400)
+            return json_response({'users': user_serializer.dump_many(users), 'per_page': per_page,
+                                  'next_cursor': next_cursor})
+
+        users = await offset_page(session, select(User), page, per_page)
+        return json_response({'users': user_serializer.dump_many(users.items), **page_links(users)})
+
+
+# Get a user
+@jwt_required
+@flask_parameters_rejected
+async def get_user(request):
+    async with Session() as session:
+        user = await get_or_404(session, User, request.path_params['user_id'])
+        return json_response(user_detail_serializer.dump(user))
+
+
+# Exchange a username or email and password for an access token
+async def login(request):
+    data = await json_body(request)
+    identifier = data.get('identifier')
+    password = data.get('password')
+
+    if not identifier or not password:
+        return json_response({'message': 'Missing required fields'}, 400)
+
+    async with Session() as session:
+        user = await session.scalar(
+            select(User).where(or_(func.lower(User.username) == func.lower(identifier),
+                                   func.lower(User.email) == func.lower(identifier))).limit(1))
+
+        # Hashing takes tens of milliseconds of CPU; keep it off the event loop
+        if not user or not await asyncio.to_thread(password_hasher.verify, user.password, password):
+            return json_response({'message': 'Invalid username/email or password'}, 401)
+
+        if password_hasher.needs_rehash(user.password):
+            try:
+                user.password = await asyncio.to_thread(password_hasher.hash, password)
+                await session.commit()
+            except SQLAlchemyError as e:
+                await session.rollback()
+                flask_app.logger.error(f"Failed to rehash password: {e}")
+
+    with flask_app.app_context():
+        access_token = create_access_token(identity=user)
+    return json_response({'access_token': access_token, 'message': 'Login successful'})
+
+
+async def http_error(request, exc):
+    # Starlette's 404s and 405s, answered as werkzeug's would be
+    return flask_error_response(default_exceptions.get(exc.status_code, InternalServerError)())
+
+
+async def database_error(request, exc):
+    flask_app.logger.error(f"Database error: {exc}")
+    return json_response({'error': 'Database error occurred'}, 500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await engine.dispose()
+
+
+routes = [
+    Route('/api/v1/blog_posts', get_blog_posts, methods=['GET']),
+    Route('/api/v1/blog_posts', create_blog_post, methods=['POST']),
+    Route('/api/v1/blog_posts/{post_id}', get_blog_post, methods=['GET']),
+    Route('/api/v1/blog_posts/{post_id}/comments', get_comments_for_blog_post, methods=['GET']),
+    Route('/api/v1/comments', create_comment, methods=['POST']),
+    Route('/api/v1/comments/{comment_id}', get_comment, methods=['GET']),
+    Route('/api/v1/users', get_users, methods=['GET']),
+    Route('/api/v1/users/{user_id}', get_user, methods=['GET']),
+    Route('/api/v1/login', login, methods=['POST']),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan,
+                exception_handlers={HTTPException: http_error, SQLAlchemyError: database_error})
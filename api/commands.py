@@ -0,0 +1,42 @@
+import sys
+import click
+from flask.cli import with_appcontext
+from api.utils.export import EXPORTS, iter_ndjson, parse_since
+from api.utils.counters import repair_comment_counts
+
+
+@click.command('export')
+@click.argument('table', type=click.Choice(sorted(EXPORTS)))
+@click.option('--since', help='Only rows created or updated at or after this ISO timestamp.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False, writable=True),
+              help='File to write to (defaults to stdout).')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+@with_appcontext
+def export_command(table, since, output, batch_size):
+    """Dump a table as newline-delimited JSON."""
+    try:
+        since = parse_since(since)
+    except ValueError:
+        raise click.BadParameter('expected an ISO 8601 timestamp', param_hint='--since')
+
+    stream = open(output, 'w', encoding='utf-8') if output else sys.stdout
+    try:
+        for chunk in iter_ndjson(table, since, batch_size):
+            stream.write(chunk)
+    finally:
+        if output:
+            stream.close()
+
+
+@click.command('repair-comment-counts')
+@click.option('--batch-size', default=1000, show_default=True, help='Posts updated per transaction.')
+@with_appcontext
+def repair_comment_counts_command(batch_size):
+    """Recompute comment_count and last_comment_at on every blog post."""
+    processed = repair_comment_counts(batch_size)
+    click.echo(f'Repaired comment counters on {processed} posts')
+
+
+def register_commands(app):
+    app.cli.add_command(export_command)
+    app.cli.add_command(repair_comment_counts_command)
@@ -8,6 +8,63 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SECRET_KEY = os.getenv('SECRET_KEY')
     JWT_SECRET_KEY = os.getenv('SECRET_KEY')
+    # Upper bound for per_page on every paginated listing
+    MAX_PER_PAGE = int(os.getenv('MAX_PER_PAGE', 100))
+    # Read-through cache for single-object lookups: 'memory', 'redis' or 'null'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 30))
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    # Largest number of objects accepted by the :batch create endpoints
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 1000))
+    # Most ids one multi-get request (?ids= or :lookup) may ask for
+    MULTIGET_MAX_IDS = int(os.getenv('MULTIGET_MAX_IDS', 100))
+    # Newest related rows embedded per object by include=comments / include=posts
+    INCLUDE_MAX_COMMENTS = int(os.getenv('INCLUDE_MAX_COMMENTS', 5))
+    INCLUDE_MAX_POSTS = int(os.getenv('INCLUDE_MAX_POSTS', 5))
+    # Default `count` mode of each paginated listing: exact, estimate or none
+    COUNT_POSTS = os.getenv('COUNT_POSTS', 'exact')
+    COUNT_USERS = os.getenv('COUNT_USERS', 'exact')
+    COUNT_COMMENTS = os.getenv('COUNT_COMMENTS', 'exact')
+    # Seconds an estimated total from COUNT(*) is reused (when no planner estimate exists)
+    COUNT_CACHE_TTL = int(os.getenv('COUNT_CACHE_TTL', 60))
+    # Deepest reply allowed under a top-level comment (which is depth 0)
+    COMMENT_MAX_DEPTH = int(os.getenv('COMMENT_MAX_DEPTH', 8))
+    # 'orjson' swaps in a faster JSON encoder (needs the orjson package)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'default')
+    # werkzeug hash method and cost for new passwords, e.g. 'scrypt:32768:8:1'
+    # or 'pbkdf2:sha256:600000'; older hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # Threads hashing passwords off the request greenlet; 0 hashes inline
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    # Seconds to cache the user behind an access token without id/role claims
+    AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', 10))
+    # Connection pool of each worker process; turned into SQLALCHEMY_ENGINE_OPTIONS
+    # by api.utils.dbpool.engine_options
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 10))
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')
+    # Postgres statement_timeout for every connection; 0 disables it
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))
+    # Log pool checkouts that wait longer than this
+    DB_SLOW_CHECKOUT_MS = int(os.getenv('DB_SLOW_CHECKOUT_MS', 100))
+    # Comma-separated read replicas for GET routes, and how long a user who
+    # just wrote keeps reading from the primary
+    DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+    REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+    # Let psycopg2 yield to other greenlets while waiting on Postgres (gevent workers)
+    DB_GREEN_WAIT = os.getenv('DB_GREEN_WAIT', 'false').lower() in ('1', 'true', 'yes')
+    # Per-request SQL profiling: Server-Timing header plus slow request, slow
+    # statement and repeated statement (N+1) warnings
+    SQL_PROFILING = os.getenv('SQL_PROFILING', 'false').lower() in ('1', 'true', 'yes')
+    SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+    SLOW_QUERY_MS = int(os.getenv('SLOW_QUERY_MS', 100))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+    # Prometheus metrics at /metrics (needs prometheus_client); set
+    # PROMETHEUS_MULTIPROC_DIR to aggregate gunicorn's worker processes
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'false').lower() in ('1', 'true', 'yes')
 
 class TestConfig(Config):
     TESTING = True
@@ -0,0 +1,15 @@
+"""WSGI entry point for gevent servers that don't monkey-patch by themselves.
+
+    python -m gevent.pywsgi ... / any server: api.green:app
+
+gunicorn's gevent worker already patches before importing the app, so with
+it `api.app:app` and DB_GREEN_WAIT=true are enough.
+"""
+import os
+from gevent import monkey
+
+# Before anything imports socket, threading or psycopg2
+monkey.patch_all()
+os.environ.setdefault('DB_GREEN_WAIT', 'true')
+
+from api.app import app  # noqa: E402
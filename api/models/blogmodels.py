@@ -1,59 +1,181 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import UUID
-from werkzeug.security import generate_password_hash, check_password_hash
-import uuid
+from sqlalchemy.dialects import sqlite
+from sqlalchemy import DDL, event
+from sqlalchemy.orm import validates
+from api.utils.passwords import password_hasher
+from api.utils.replicas import RoutingSession
+from api.utils.ids import uuid7
 
-db = SQLAlchemy()
+# Reads in GET routes may be routed to a replica (see api/utils/replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# SQLite's CURRENT_TIMESTAMP has no fractional seconds; bind Python datetimes in
+# the same format so keyset comparisons against server defaults line up.
+Timestamp = db.DateTime().with_variant(
+    sqlite.DATETIME(storage_format='%(year)04d-%(month)02d-%(day)02d '
+                                   '%(hour)02d:%(minute)02d:%(second)02d'),
+    'sqlite'
+)
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     username = db.Column(db.String(50), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(256), nullable=False)
     firstname = db.Column(db.String(128), nullable=False)
     lastname = db.Column(db.String(128), nullable=False)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, onupdate=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, onupdate=db.func.now())
     is_active = db.Column(db.Boolean, default=True)
     role = db.Column(db.String(50), default='author')
 
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        self.password = password_hasher.hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        return password_hasher.verify(self.password, password)
 
 
     # Relationships
     posts = db.relationship('BlogPost', back_populates='author', lazy=True)
     comments = db.relationship('Comment', back_populates='user', lazy=True)
 
+# Usernames and emails are unique regardless of case; these also serve the login lookup
+db.Index('ix_users_lower_username', db.func.lower(User.username), unique=True)
+db.Index('ix_users_lower_email', db.func.lower(User.email), unique=True)
+
+EXCERPT_LENGTH = 280
+
+def make_excerpt(content):
+    """Plain-text summary of a post: whitespace collapsed, cut at a word boundary."""
+    text = ' '.join((content or '').split())
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    cut = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0]
+    return cut.rstrip('.,;:') + '...'
+
+def _excerpt_default(context):
+    # Covers Core INSERTs (e.g. the :batch endpoint) that bypass the validator below
+    return make_excerpt(context.get_current_parameters().get('content'))
+
 class BlogPost(db.Model):
     __tablename__ = 'blog_posts'
+    __table_args__ = (
+        db.Index('ix_blog_posts_created_at_id', 'created_at', 'id'),
+        db.Index('ix_blog_posts_author_id_created_at', 'author_id', 'created_at'),
+    )
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, onupdate=db.func.now())
+    # Stored summary for listings, so they don't have to read `content`
+    excerpt = db.Column(db.String(EXCERPT_LENGTH + 3), default=_excerpt_default)
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, onupdate=db.func.now())
     author_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
+    # Denormalized from comments; maintained by create_comment/delete_comment
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_comment_at = db.Column(Timestamp)
 
     # Relationships
     author = db.relationship('User', back_populates='posts', lazy=True)
     comments = db.relationship('Comment', back_populates='blog_post', lazy=True)
 
+    @validates('content')
+    def _update_excerpt(self, key, content):
+        self.excerpt = make_excerpt(content)
+        return content
+
+# Thread paths compare byte by byte on Postgres, whatever the database's locale,
+# so a subtree is one contiguous range of the index
+ThreadPath = db.Text().with_variant(postgresql.TEXT(collation='C'), 'postgresql')
+
+def _path_default(context):
+    # Rows inserted without place_in_thread() (e.g. the :batch endpoint) start a thread
+    return context.get_current_parameters()['id'].hex + '/'
+
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        db.Index('ix_comments_blog_post_id_created_at_id', 'blog_post_id', 'created_at', 'id'),
+        db.Index('ix_comments_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('ix_comments_path', 'path'),
+        db.Index('ix_comments_parent_id', 'parent_id'),
+        # Keyset paging over the threads of a post
+        db.Index('ix_comments_top_level', 'blog_post_id', 'created_at', 'id',
+                 postgresql_where=db.text('parent_id IS NULL'), sqlite_where=db.text('parent_id IS NULL')),
+    )
 
-    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     blog_post_id = db.Column(UUID(as_uuid=True), db.ForeignKey('blog_posts.id'), nullable=False)
     user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     comment = db.Column(db.Text, nullable=False)
-    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    created_at = db.Column(Timestamp, server_default=db.func.now())
+    updated_at = db.Column(Timestamp, onupdate=db.func.now())
+    # Replies: the comment replied to, and the materialized path of hex ids
+    # from the thread's top-level comment down to this one, each followed by
+    # '/'. Ids are time-ordered UUIDs, so ordering by path lists a thread
+    # depth first with siblings oldest first.
+    parent_id = db.Column(UUID(as_uuid=True), db.ForeignKey('comments.id'), nullable=True)
+    path = db.Column(ThreadPath, nullable=False, default=_path_default)
+    depth = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     # Relationships
     blog_post = db.relationship('BlogPost', back_populates='comments', lazy=True)
-    user = db.relationship('User', back_populates='comments', lazy=True)
\ No newline at end of file
+    user = db.relationship('User', back_populates='comments', lazy=True)
+
+    def place_in_thread(self, parent=None):
+        """Make this new comment a reply to `parent`, or the start of a thread."""
+        if self.id is None:
+            self.id = uuid7()
+        self.parent_id = parent.id if parent else None
+        self.depth = parent.depth + 1 if parent else 0
+        self.path = (parent.path if parent else '') + self.id.hex + '/'
+
+    @staticmethod
+    def subtree(path, max_depth=None):
+        """Filters selecting the comment at `path` and its replies, as one index range."""
+        # '0' follows '/' and precedes every hex digit
+        conditions = [Comment.path >= path, Comment.path < path[:-1] + '0']
+        if max_depth is not None:
+            conditions.append(Comment.depth <= max_depth)
+        return conditions
+
+
+# Full-text search over blog posts. On Postgres a generated tsvector column
+# with a GIN index (see migration 837a50212817); on SQLite an FTS5 table kept
+# in sync by triggers, so search works in the test setup. The FTS table holds
+# its own copy of the text plus the post id: blog_posts has a UUID key, and
+# its hidden rowid can be renumbered by VACUUM, so it can't link the two.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(content, '')), 'B')"
+)
+
+for statement in (
+    f"ALTER TABLE blog_posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED",
+    "CREATE INDEX ix_blog_posts_search_vector ON blog_posts USING GIN (search_vector)",
+):
+    event.listen(BlogPost.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+for statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_posts_fts USING fts5(post_id UNINDEXED, title, content)",
+    "CREATE TRIGGER blog_posts_fts_insert AFTER INSERT ON blog_posts BEGIN "
+    "INSERT INTO blog_posts_fts(post_id, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER blog_posts_fts_delete AFTER DELETE ON blog_posts BEGIN "
+    "DELETE FROM blog_posts_fts WHERE post_id = old.id; END",
+    "CREATE TRIGGER blog_posts_fts_update AFTER UPDATE OF title, content ON blog_posts BEGIN "
+    "UPDATE blog_posts_fts SET title = new.title, content = new.content WHERE post_id = old.id; END",
+):
+    event.listen(BlogPost.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+event.listen(BlogPost.__table__, 'after_drop',
+             DDL("DROP TABLE IF EXISTS blog_posts_fts").execute_if(dialect='sqlite'))
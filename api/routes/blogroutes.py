@@ -1,10 +1,67 @@
 from flask import Blueprint, request, jsonify
+from werkzeug.exceptions import NotFound
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from api.models.blogmodels import db, BlogPost, User, Comment
-from api.schemas.blogschema import BlogPostSchema
+from sqlalchemy.orm import selectinload
+from api.schemas.serializers import post_serializer, user_serializer, comment_serializer, search_result_serializer
+from api.utils.pagination import keyset_paginate, clamp_per_page, InvalidCursor
+from api.utils.cache import model_cache, to_uuid
+from api.utils.export import ndjson_response
+from api.utils.search import search_posts
+from api.utils.batch import batch_items, existing_ids, insert_rows, failure, invalid_item, batch_response
+from api.utils.etag import object_etag, collection_etag, not_modified, with_etag
+from api.utils.includes import (parse_include, include_limit, latest_children, embedded_rows, embed,
+                                InvalidInclude)
+from api.utils.fieldsets import parse_fields, load_only_fields, InvalidFields
+from api.utils.counting import parse_count, estimated_count, paginate, InvalidCountMode
+from api.utils.multiget import requested_ids, fetch_by_ids, InvalidIds
 from sqlalchemy.exc import SQLAlchemyError
 
-blog_post_schema = BlogPostSchema()
+POST_INCLUDES = {'author': user_serializer.dump, 'comments': comment_serializer.dump_many}
+
+
+def load_post_includes(posts, include):
+    """Load the relationships named in `include` for posts, one query each."""
+    embeds = {}
+    if 'author' in include:
+        # Listings preload authors with selectinload; a single post lazy-loads its one author
+        embeds['author'] = {post.id: post.author for post in posts}
+    if 'comments' in include:
+        embeds['comments'] = latest_children(Comment, 'blog_post_id', [post.id for post in posts],
+                                             include_limit('comments'))
+    return embeds
+
+
+def posts_by_ids():
+    """Respond with the posts asked for by id, in the order asked, plus the ids not found."""
+    try:
+        ids = requested_ids()
+        include = parse_include(POST_INCLUDES)
+        fields = parse_fields(post_serializer.fields)
+    except InvalidIds as e:
+        return jsonify({'error': str(e)}), 400
+    except InvalidInclude as e:
+        return jsonify({'error': f'Unknown include: {e}'}), 400
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+
+    query = BlogPost.query
+    if fields:
+        query = query.options(load_only_fields(BlogPost, fields, 'author_id'))
+    if 'author' in include:
+        query = query.options(selectinload(BlogPost.author))
+    posts, missing = fetch_by_ids(query, BlogPost, ids)
+
+    embeds = load_post_includes(posts, include)
+    etag = collection_etag(posts + list(embedded_rows(embeds)), missing, sorted(include), fields)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    return with_etag(jsonify({
+        'posts': embed(post_serializer.dump_many(posts, fields), posts, embeds, POST_INCLUDES),
+        'missing': missing
+    }), etag, weak=True), 200
 
 
 blog_bp = Blueprint('blog', __name__, url_prefix='/api/v1')
@@ -22,49 +79,135 @@ def create_blog_post():
         return jsonify({'error': 'Missing required fields'}), 400
 
     try:
-        user = User.query.get(author_id)
+        user = model_cache.get(User, author_id)
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        new_post = BlogPost(title=title, content=content, author_id=author_id)
+        new_post = BlogPost(title=title, content=content, author_id=user.id)
         db.session.add(new_post)
         db.session.commit()
-        return jsonify({'message': 'Blog post created successfully', 'post': {
-            'id': str(new_post.id),
-            'title': new_post.title,
-            'content': new_post.content,
-            'author_id': str(new_post.author_id)
-        }}), 201
+        return jsonify({'message': 'Blog post created successfully',
+                        'post': post_serializer.dump(new_post, ('id', 'title', 'content', 'author_id'))}), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# Create many blog posts in one transaction
+@blog_bp.route('/blog_posts:batch', methods=['POST'])
+@jwt_required()
+def create_blog_posts_batch():
+    from api.app import app
+    items, error = batch_items(request.get_json(silent=True), 'posts')
+    if error:
+        return error
+
+    try:
+        authors = existing_ids(User, [item.get('author_id') for item in items if isinstance(item, dict)])
+
+        results = [None] * len(items)
+        rows, indexes = [], []
+        for index, item in enumerate(items):
+            invalid = invalid_item(index, item, ('title', 'content', 'author_id'))
+            if invalid:
+                results[index] = invalid
+            elif to_uuid(item['author_id']) not in authors:
+                results[index] = failure(index, 404, 'User not found')
+            else:
+                rows.append({'title': item['title'], 'content': item['content'],
+                             'author_id': to_uuid(item['author_id'])})
+                indexes.append(index)
+
+        for index, row in zip(indexes, insert_rows(BlogPost, rows)):
+            results[index] = {'index': index, 'status': 201, 'id': str(row.id)}
+        db.session.commit()
+
+        return batch_response(results)
+
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"Database error: {e}")
+        return jsonify({'error': 'Database error occurred'}), 500
+
+
 # Route to fetch all blog posts with pagination and authentication
 @blog_bp.route('/blog_posts', methods=['GET'])
 @jwt_required()
 def get_blog_posts():
     from api.app import app
     try:
+        # ?ids=a,b,c fetches those posts instead of a page
+        if 'ids' in request.args:
+            return posts_by_ids()
+
         page = request.args.get('page', default=1, type=int)
         per_page = request.args.get('per_page', default=10, type=int)
 
         if page < 1 or per_page < 1:
             return jsonify({'error': 'Invalid pagination parameters'}), 400
 
-        paginated_posts = BlogPost.query.paginate(page=page, per_page=per_page, error_out=False)
-        posts_schema = BlogPostSchema(many=True)
-        result = posts_schema.dump(paginated_posts.items)
+        per_page = clamp_per_page(per_page)
+
+        try:
+            include = parse_include(POST_INCLUDES)
+            fields = parse_fields(post_serializer.fields)
+            count = parse_count('posts')
+        except InvalidInclude as e:
+            return jsonify({'error': f'Unknown include: {e}'}), 400
+        except InvalidFields as e:
+            return jsonify({'error': f'Unknown fields: {e}'}), 400
+        except InvalidCountMode as e:
+            return jsonify({'error': f'Invalid count: {e}'}), 400
+
+        query = BlogPost.query
+        if fields:
+            # Defer unrequested columns, most importantly the large `content`
+            query = query.options(load_only_fields(BlogPost, fields, 'author_id'))
+        if 'author' in include:
+            query = query.options(selectinload(BlogPost.author))
+
+        # Cursor mode: seek by (created_at, id) instead of OFFSET/COUNT
+        if 'cursor' in request.args:
+            try:
+                posts, next_cursor = keyset_paginate(query, BlogPost,
+                                                     request.args.get('cursor'), per_page)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+            embeds = load_post_includes(posts, include)
+            etag = collection_etag(posts + list(embedded_rows(embeds)), next_cursor, sorted(include), fields)
+            cached = not_modified(etag, weak=True)
+            if cached:
+                return cached
+
+            response = {
+                'posts': embed(post_serializer.dump_many(posts, fields), posts, embeds, POST_INCLUDES),
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            }
+            return with_etag(jsonify(response), etag, weak=True), 200
+
+        paginated_posts = paginate(query, page, per_page, count, lambda: estimated_count(BlogPost))
+
+        embeds = load_post_includes(paginated_posts.items, include)
+        etag = collection_etag(paginated_posts.items + list(embedded_rows(embeds)),
+                               paginated_posts.total, page, per_page, sorted(include), fields)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+
+        result = embed(post_serializer.dump_many(paginated_posts.items, fields), paginated_posts.items, embeds,
+                       POST_INCLUDES)
 
         response = {
             'posts': result,
             'total': paginated_posts.total,
             'pages': paginated_posts.pages,
             'current_page': paginated_posts.page,
-            'next_page': paginated_posts.next_num if paginated_posts.has_next else None,
-            'prev_page': paginated_posts.prev_num if paginated_posts.has_prev else None
+            'next_page': paginated_posts.next_page,
+            'prev_page': paginated_posts.prev_page
         }
 
-        return jsonify(response), 200
+        return with_etag(jsonify(response), etag, weak=True), 200
 
     except SQLAlchemyError as e:
         app.logger.error(f"Database error: {e}")
@@ -75,24 +218,95 @@ def get_blog_posts():
         return jsonify({'error': 'Internal server error'}), 500
 
 
+# Fetch posts by id, with the list in the body
+@blog_bp.route('/blog_posts:lookup', methods=['POST'])
+@jwt_required()
+def lookup_blog_posts():
+    from api.app import app
+    try:
+        return posts_by_ids()
+    except SQLAlchemyError as e:
+        app.logger.error(f"Database error: {e}")
+        return jsonify({'error': 'Database error occurred'}), 500
+
+# Full-text search over post titles and content
+@blog_bp.route('/blog_posts/search', methods=['GET'])
+@jwt_required()
+def search_blog_posts():
+    from api.app import app
+    q = request.args.get('q', '').strip()
+    per_page = request.args.get('per_page', default=10, type=int)
+
+    if not q:
+        return jsonify({'error': 'Missing search query'}), 400
+    if per_page < 1:
+        return jsonify({'error': 'Invalid pagination parameters'}), 400
+
+    try:
+        rows, next_cursor = search_posts(q, request.args.get('cursor'), clamp_per_page(per_page))
+    except InvalidCursor:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    except SQLAlchemyError as e:
+        app.logger.error(f"Database error: {e}")
+        return jsonify({'error': 'Database error occurred'}), 500
+
+    return jsonify({
+        'results': search_result_serializer.dump_many(rows),
+        'per_page': per_page,
+        'next_cursor': next_cursor
+    }), 200
+
+
+# Stream every blog post as NDJSON
+@blog_bp.route('/blog_posts/export', methods=['GET'])
+@jwt_required()
+def export_blog_posts():
+    return ndjson_response('posts')
+
+
 # Get a blog post
 @blog_bp.route('/blog_posts/<string:post_id>', methods=['GET'])
 @jwt_required()
 def get_blog_post(post_id):
     from api.app import app
     try:
-        post = BlogPost.query.get_or_404(post_id)
+        include = parse_include(POST_INCLUDES)
+        fields = parse_fields(post_serializer.fields)
+    except InvalidInclude as e:
+        return jsonify({'error': f'Unknown include: {e}'}), 400
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+
+    try:
+        post = model_cache.get_or_404(BlogPost, post_id)
 
-        post_data = blog_post_schema.dump(post)
+        if not include:
+            etag = object_etag(post, fields) if fields else object_etag(post)
+            cached = not_modified(etag)
+            if cached:
+                return cached
+            return with_etag(jsonify(post_serializer.dump(post, fields)), etag), 200
 
-        return jsonify(post_data), 200
+        # Embedded rows change independently of the post, so the tag covers them too
+        embeds = load_post_includes([post], include)
+        etag = collection_etag([post, *embedded_rows(embeds)], sorted(include), fields)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+
+        post_data = embed([post_serializer.dump(post, fields)], [post], embeds, POST_INCLUDES)[0]
+
+        return with_etag(jsonify(post_data), etag, weak=True), 200
+
+    except NotFound:
+        raise
 
     except SQLAlchemyError as e:
-        app.loggger.error(f"Database error: {e}")
+        app.logger.error(f"Database error: {e}")
         return jsonify({'error': 'Database error occurred'}), 500
 
     except Exception as e:
-        app.loggger.error(f"Internal server error: {e}")
+        app.logger.error(f"Internal server error: {e}")
         return jsonify({'error': 'Internal server error occurred'}), 500
 
 
@@ -119,11 +333,7 @@ def update_blog_post(post_id):
 
         return jsonify({
             'message': 'Blog post updated successfully',
-            'post': {
-                'id': str(post.id),
-                'title': post.title,
-                'content': post.content
-            }
+            'post': post_serializer.dump(post, ('id', 'title', 'content'))
         }), 200
 
     except Exception as e:
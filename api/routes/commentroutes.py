@@ -1,14 +1,76 @@
 
-from flask import Blueprint, request, jsonify, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, abort, current_app
+from werkzeug.exceptions import NotFound
+from flask_jwt_extended import jwt_required
 from marshmallow import ValidationError
 from api.schemas.commentshema import comment_schema
 from api.models.blogmodels import BlogPost, User, Comment, db
+from sqlalchemy import and_, delete, or_, select
 from sqlalchemy.exc import SQLAlchemyError
-from api.utils.utils import is_admin
+from api.utils.auth import auth_required, current_user
+from api.utils.cache import model_cache, to_uuid
+from api.utils.export import ndjson_response
+from api.utils.counters import comments_added, comments_removed
+from api.utils.batch import batch_items, existing_ids, insert_rows, failure, invalid_item, batch_response
+from api.utils.pagination import keyset_paginate, clamp_per_page, encode_keys, decode_keys, InvalidCursor
+from api.utils.etag import object_etag, collection_etag, not_modified, with_etag
+from api.utils.fieldsets import parse_fields, load_only_fields, InvalidFields
+from api.utils.counting import parse_count, paginate, InvalidCountMode
+from api.utils.multiget import requested_ids, fetch_by_ids, InvalidIds
+from api.schemas.serializers import comment_serializer
 
 
 comments_bp = Blueprint('comments', __name__, url_prefix='/api/v1')
+# Fields of a comment in a post's listing (the post id is given once, at the top)
+COMMENT_LIST_FIELDS = ('id', 'user_id', 'comment', 'created_at')
+# Fields of a comment within a thread
+THREAD_FIELDS = ('id', 'parent_id', 'user_id', 'depth', 'comment', 'created_at')
+
+
+def reply_error(parent, post_id, max_depth):
+    """Why `parent` can't take a reply on post `post_id`, as (message, status), or None."""
+    if not parent:
+        return 'Parent comment not found', 404
+    if parent.blog_post_id != post_id:
+        return 'Parent comment belongs to another blog post', 400
+    if parent.depth >= max_depth:
+        return 'Maximum reply depth reached', 400
+    return None
+
+
+def parse_depth():
+    """Levels of replies requested with `depth=`, capped at COMMENT_MAX_DEPTH."""
+    max_depth = current_app.config.get('COMMENT_MAX_DEPTH', 8)
+    depth = request.args.get('depth', max_depth, type=int)
+    if depth < 0:
+        return None
+    return min(depth, max_depth)
+
+
+def comments_by_ids():
+    """Respond with the comments asked for by id, in the order asked, plus the ids not found."""
+    try:
+        ids = requested_ids()
+        fields = parse_fields(comment_serializer.fields)
+    except InvalidIds as e:
+        return jsonify({'error': str(e)}), 400
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+
+    query = Comment.query
+    if fields:
+        query = query.options(load_only_fields(Comment, fields))
+    comments, missing = fetch_by_ids(query, Comment, ids)
+
+    etag = collection_etag(comments, missing, fields)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    return with_etag(jsonify({
+        'comments': comment_serializer.dump_many(comments, fields),
+        'missing': missing
+    }), etag, weak=True), 200
 
 # create comment
 @comments_bp.route('/comments', methods=['POST'])
@@ -17,31 +79,92 @@ def create_comment():
     data = request.get_json()
     blog_post_id = data.get('blog_post_id')
     user_id = data.get('user_id')
+    parent_id = data.get('parent_id')
     comment_text = data.get('comment')
 
     if not blog_post_id or not user_id or not comment_text:
         return jsonify({'error': 'Missing required fields'}), 400
 
     try:
-        post = BlogPost.query.get(blog_post_id)
-        user = User.query.get(user_id)
+        post = model_cache.get(BlogPost, blog_post_id)
+        user = model_cache.get(User, user_id)
 
         if not post:
             return jsonify({'error': 'Blog post not found'}), 404
         if not user:
             return jsonify({'error': 'User not found'}), 404
 
-        new_comment = Comment(blog_post_id=blog_post_id,
-                              user_id=user_id, comment=comment_text)
+        parent = None
+        if parent_id:
+            parent = model_cache.get(Comment, parent_id)
+            error = reply_error(parent, post.id, current_app.config.get('COMMENT_MAX_DEPTH', 8))
+            if error:
+                message, status = error
+                return jsonify({'error': message}), status
+
+        new_comment = Comment(blog_post_id=post.id,
+                              user_id=user.id, comment=comment_text)
+        new_comment.place_in_thread(parent)
         db.session.add(new_comment)
+        comments_added(post.id)
         db.session.commit()
-        return jsonify({'message': 'Comment added successfully', 'comment': {
-            'id': str(new_comment.id),
-            'blog_post_id': str(new_comment.blog_post_id),
-            'user_id': str(new_comment.user_id),
-            'comment': new_comment.comment,
-            'created_at': new_comment.created_at
-        }}), 201
+        return jsonify({'message': 'Comment added successfully',
+                        'comment': comment_serializer.dump(new_comment)}), 201
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
+
+# get comments by id: GET /comments?ids=a,b,c, or POST /comments:lookup with the list in the body
+@comments_bp.route('/comments', methods=['GET'])
+@comments_bp.route('/comments:lookup', methods=['POST'])
+@jwt_required()
+def get_comments_by_ids():
+    try:
+        return comments_by_ids()
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
+
+# create many comments in one transaction
+@comments_bp.route('/comments:batch', methods=['POST'])
+@jwt_required()
+def create_comments_batch():
+    items, error = batch_items(request.get_json(silent=True), 'comments')
+    if error:
+        return error
+
+    try:
+        valid_items = [item for item in items if isinstance(item, dict)]
+        posts = existing_ids(BlogPost, [item.get('blog_post_id') for item in valid_items])
+        users = existing_ids(User, [item.get('user_id') for item in valid_items])
+
+        results = [None] * len(items)
+        rows, indexes = [], []
+        for index, item in enumerate(items):
+            invalid = invalid_item(index, item, ('blog_post_id', 'user_id', 'comment'))
+            if invalid:
+                results[index] = invalid
+            elif to_uuid(item['blog_post_id']) not in posts:
+                results[index] = failure(index, 404, 'Blog post not found')
+            elif to_uuid(item['user_id']) not in users:
+                results[index] = failure(index, 404, 'User not found')
+            else:
+                rows.append({'blog_post_id': to_uuid(item['blog_post_id']),
+                             'user_id': to_uuid(item['user_id']),
+                             'comment': item['comment']})
+                indexes.append(index)
+
+        for index, row in zip(indexes, insert_rows(Comment, rows)):
+            results[index] = {'index': index, 'status': 201, 'id': str(row.id)}
+
+        per_post = {}
+        for row in rows:
+            per_post[row['blog_post_id']] = per_post.get(row['blog_post_id'], 0) + 1
+        for post_id, count in per_post.items():
+            comments_added(post_id, count)
+        db.session.commit()
+
+        return batch_response(results)
+
     except SQLAlchemyError as e:
         db.session.rollback()
         return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
@@ -51,7 +174,7 @@ def create_comment():
 @jwt_required()
 def get_comments_for_blog_post(post_id):
     try:
-        post = BlogPost.query.get_or_404(post_id)
+        post = model_cache.get_or_404(BlogPost, post_id)
 
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
@@ -59,14 +182,48 @@ def get_comments_for_blog_post(post_id):
         if page < 1 or per_page < 1:
             return jsonify({'error': 'Page number and per_page must be positive integers'}), 400
 
-        pagination = Comment.query.filter_by(blog_post_id=post.id).paginate(page=page, per_page=per_page, error_out=False)
-
-        comments_data = [{
-            'id': str(comment.id),
-            'user_id': str(comment.user_id),
-            'comment': comment.comment,
-            'created_at': comment.created_at
-        } for comment in pagination.items]
+        try:
+            fields = parse_fields(COMMENT_LIST_FIELDS)
+            count = parse_count('comments')
+        except InvalidFields as e:
+            return jsonify({'error': f'Unknown fields: {e}'}), 400
+        except InvalidCountMode as e:
+            return jsonify({'error': f'Invalid count: {e}'}), 400
+
+        per_page = clamp_per_page(per_page)
+        query = Comment.query.filter_by(blog_post_id=post.id)
+        if fields:
+            query = query.options(load_only_fields(Comment, fields))
+
+        # Cursor mode: oldest first, seeking by (created_at, id)
+        if 'cursor' in request.args:
+            try:
+                comments, next_cursor = keyset_paginate(query, Comment, request.args.get('cursor'),
+                                                        per_page, descending=False)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+            etag = collection_etag(comments, next_cursor, fields)
+            cached = not_modified(etag, weak=True)
+            if cached:
+                return cached
+
+            return with_etag(jsonify({
+                'post_id': str(post.id),
+                'comments': comment_serializer.dump_many(comments, fields or COMMENT_LIST_FIELDS),
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            }), etag, weak=True), 200
+
+        # The post's denormalized counter is the estimate: no COUNT(*) over its comments
+        pagination = paginate(query, page, per_page, count, lambda: post.comment_count)
+
+        etag = collection_etag(pagination.items, pagination.total, page, per_page, fields)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+
+        comments_data = comment_serializer.dump_many(pagination.items, fields or COMMENT_LIST_FIELDS)
 
         result = {
             'post_id': str(post.id),
@@ -74,13 +231,116 @@ def get_comments_for_blog_post(post_id):
             'page': page,
             'per_page': per_page,
             'total_comments': pagination.total,
-            'total_pages': pagination.pages
+            'total_pages': pagination.pages,
+            'next_page': pagination.next_page
         }
 
-        return jsonify(result), 200
+        return with_etag(jsonify(result), etag, weak=True), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
+
+# get a post's threads: top-level comments, oldest first, each with its replies
+@comments_bp.route('/blog_posts/<string:post_id>/threads', methods=['GET'])
+@jwt_required()
+def get_threads_for_blog_post(post_id):
+    try:
+        post = model_cache.get_or_404(BlogPost, post_id)
+
+        per_page = request.args.get('per_page', 10, type=int)
+        depth = parse_depth()
+        if per_page < 1 or depth is None:
+            return jsonify({'error': 'per_page must be positive and depth not negative'}), 400
+        per_page = clamp_per_page(per_page)
+
+        query = Comment.query.filter(Comment.blog_post_id == post.id, Comment.parent_id.is_(None))
+        try:
+            roots, next_cursor = keyset_paginate(query, Comment, request.args.get('cursor'),
+                                                 per_page, descending=False)
+        except InvalidCursor:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+        # Every reply of the page in one query: a path range per thread
+        replies = []
+        if roots and depth:
+            replies = Comment.query.filter(
+                or_(*[and_(*Comment.subtree(root.path)) for root in roots]),
+                Comment.depth.between(1, depth)
+            ).order_by(Comment.path).all()
+
+        threads = {root.path: [] for root in roots}
+        for reply in replies:
+            threads[reply.path[:33]].append(reply)
+
+        etag = collection_etag(roots + replies, next_cursor, depth)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+
+        return with_etag(jsonify({
+            'post_id': str(post.id),
+            'threads': [dict(comment_serializer.dump(root, THREAD_FIELDS),
+                             replies=comment_serializer.dump_many(threads[root.path], THREAD_FIELDS))
+                        for root in roots],
+            'per_page': per_page,
+            'depth': depth,
+            'next_cursor': next_cursor
+        }), etag, weak=True), 200
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
+
+# get a comment and its replies, depth first
+@comments_bp.route('/comments/<string:comment_id>/thread', methods=['GET'])
+@jwt_required()
+def get_comment_thread(comment_id):
+    try:
+        comment = model_cache.get_or_404(Comment, comment_id)
+
+        per_page = request.args.get('per_page', 50, type=int)
+        depth = parse_depth()
+        if per_page < 1 or depth is None:
+            return jsonify({'error': 'per_page must be positive and depth not negative'}), 400
+        per_page = clamp_per_page(per_page)
+
+        # One range scan of ix_comments_path, already in thread order;
+        # the cursor is the path of the last comment returned
+        query = Comment.query.filter(*Comment.subtree(comment.path, comment.depth + depth))
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                after, = decode_keys(cursor, 1)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+            if not isinstance(after, str):
+                return jsonify({'error': 'Invalid cursor'}), 400
+            query = query.filter(Comment.path > after)
+
+        comments = query.order_by(Comment.path).limit(per_page + 1).all()
+        next_cursor = None
+        if len(comments) > per_page:
+            comments = comments[:per_page]
+            next_cursor = encode_keys(comments[-1].path)
+
+        etag = collection_etag(comments, next_cursor, depth)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+
+        return with_etag(jsonify({
+            'comment_id': str(comment.id),
+            'comments': comment_serializer.dump_many(comments, THREAD_FIELDS),
+            'per_page': per_page,
+            'depth': depth,
+            'next_cursor': next_cursor
+        }), etag, weak=True), 200
     except SQLAlchemyError as e:
         return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
 
+# stream every comment as NDJSON
+@comments_bp.route('/comments/export', methods=['GET'])
+@jwt_required()
+def export_comments():
+    return ndjson_response('comments')
+
 # get a comment
 @comments_bp.route('/comments/<string:comment_id>', methods=['GET'])
 @jwt_required()
@@ -90,17 +350,23 @@ def get_comment(comment_id):
         return jsonify({'error': 'Invalid comment ID format'}), 400
 
     try:
-        comment = Comment.query.get_or_404(comment_id)
-
-        comment_data = {
-            'id': str(comment.id),
-            'blog_post_id': str(comment.blog_post_id),
-            'user_id': str(comment.user_id),
-            'comment': comment.comment,
-            'created_at': comment.created_at
-        }
+        fields = parse_fields(comment_serializer.fields)
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
 
-        return jsonify(comment_data), 200
+    try:
+        comment = model_cache.get_or_404(Comment, comment_id)
+
+        etag = object_etag(comment, fields) if fields else object_etag(comment)
+        cached = not_modified(etag)
+        if cached:
+            return cached
+
+        comment_data = comment_serializer.dump(comment, fields)
+
+        return with_etag(jsonify(comment_data), etag), 200
+    except NotFound:
+        raise
     except SQLAlchemyError as e:
         app.logger.error(f"Database error occurred: {str(e)}")
         return jsonify({'error': 'Database error occurred', 'details': str(e)}), 500
@@ -110,7 +376,7 @@ def get_comment(comment_id):
 
 # update a comment
 @comments_bp.route('/comments/<string:comment_id>', methods=['PUT'])
-@jwt_required()
+@auth_required()
 def update_comment(comment_id):
     from api.app import app
     data = request.get_json()
@@ -119,25 +385,20 @@ def update_comment(comment_id):
     if not comment_text:
         return jsonify({'error': 'Missing comment text'}), 400
 
-    current_user = get_jwt_identity()
-
     try:
-        comment = Comment.query.get_or_404(comment_id)
+        comment = model_cache.get_for_write_or_404(Comment, comment_id)
 
-
-        if comment.user_id != current_user['id']:
+        if comment.user_id != current_user.id:
             return jsonify({'error': 'Unauthorized access'}), 403
 
         comment.comment = comment_text
         db.session.commit()
 
-        return jsonify({'message': 'Comment updated successfully', 'comment': {
-            'id': str(comment.id),
-            'blog_post_id': str(comment.blog_post_id),
-            'user_id': str(comment.user_id),
-            'comment': comment.comment,
-            'created_at': comment.created_at
-        }}), 200
+        return jsonify({'message': 'Comment updated successfully',
+                        'comment': comment_serializer.dump(comment)}), 200
+
+    except NotFound:
+        raise
 
     except SQLAlchemyError as e:
         db.session.rollback()
@@ -151,21 +412,27 @@ def update_comment(comment_id):
 
 # delete a comment
 @comments_bp.route('/comments/<string:comment_id>', methods=['DELETE'])
-@jwt_required()
+@auth_required()
 def delete_comment(comment_id):
-    current_user_id = get_jwt_identity()
-
     try:
-        comment = Comment.query.get_or_404(comment_id)
-        post = BlogPost.query.get_or_404(comment.blog_post_id)
+        comment = model_cache.get_for_write_or_404(Comment, comment_id)
+        post = model_cache.get_for_write_or_404(BlogPost, comment.blog_post_id)
 
-        if comment.user_id != current_user_id and post.author_id != current_user_id and not is_admin(current_user_id):
+        # Id and role come from the token, so this check needs no query
+        if comment.user_id != current_user.id and post.author_id != current_user.id and not current_user.is_admin:
             return jsonify({'error': 'You are not authorized to delete this comment'}), 403
 
-        db.session.delete(comment)
+        # Replies go with the comment: the whole subtree is one path range
+        ids = db.session.scalars(select(Comment.id).where(*Comment.subtree(comment.path))).all()
+        db.session.execute(delete(Comment).where(Comment.id.in_(ids)))
+        model_cache.invalidate_on_commit(Comment, *ids)
+        comments_removed(post.id, len(ids))
         db.session.commit()
 
-        return jsonify({'message': 'Comment deleted successfully'}), 200
+        return jsonify({'message': 'Comment deleted successfully', 'deleted': len(ids)}), 200
+
+    except NotFound:
+        raise
 
     except SQLAlchemyError as e:
         db.session.rollback()
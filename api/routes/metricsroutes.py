@@ -0,0 +1,14 @@
+from flask import Blueprint, jsonify
+from api.utils.metrics import metrics
+
+
+metrics_bp = Blueprint('metrics', __name__)
+
+# Prometheus scrape target; restrict access to it at the proxy
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not metrics.enabled:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+
+    body, content_type = metrics.exposition()
+    return body, 200, {'Content-Type': content_type}
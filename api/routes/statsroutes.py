@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify
+from api.models.blogmodels import db
+from api.utils.auth import auth_required, current_user
+from api.utils.dbpool import pool_status
+
+
+stats_bp = Blueprint('stats', __name__, url_prefix='/api/v1')
+
+# Connection pool usage of this worker process, for admins
+@stats_bp.route('/stats/pool', methods=['GET'])
+@auth_required()
+def get_pool_stats():
+    if not current_user.is_admin:
+        return jsonify({'error': 'Admin access required'}), 403
+
+    return jsonify({
+        (bind or 'default'): pool_status(engine) for bind, engine in db.engines.items()
+    }), 200
@@ -1,14 +1,89 @@
-import uuid
-from uuid import UUID
 from flask import request, jsonify, Blueprint
-from api.models.blogmodels import User
-from sqlalchemy.exc import SQLAlchemyError
-from werkzeug.security import generate_password_hash
+from werkzeug.exceptions import NotFound
+from api.models.blogmodels import User, BlogPost
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from api.utils.passwords import password_hasher
 from flask_jwt_extended import jwt_required, create_access_token
-from api.schemas.userschema import UserSchema
+from api.schemas.serializers import post_serializer, user_serializer, user_detail_serializer
+from api.utils.pagination import keyset_paginate, clamp_per_page, InvalidCursor
+from api.utils.cache import model_cache, to_uuid
+from api.utils.export import ndjson_response
+from api.utils.batch import batch_items, insert_rows, failure, invalid_item, batch_response
+from api.utils.etag import object_etag, collection_etag, not_modified, with_etag
+from api.utils.includes import parse_include, include_limit, latest_children, embedded_rows, embed, InvalidInclude
+from api.utils.fieldsets import parse_fields, load_only_fields, InvalidFields
+from api.utils.counting import parse_count, estimated_count, paginate, InvalidCountMode
+from api.utils.multiget import requested_ids, fetch_by_ids, InvalidIds
 
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/v1')
+USER_INCLUDES = {'posts': post_serializer.dump_many}
+# Unique constraints on users and the field each protects. Postgres names the
+# constraint in its error; SQLite names the column or the index.
+USER_UNIQUE_FIELDS = {
+    'ix_users_lower_username': 'username',
+    'users_username_key': 'username',
+    'users.username': 'username',
+    'ix_users_lower_email': 'email',
+    'users_email_key': 'email',
+    'users.email': 'email',
+}
+
+
+def conflicting_field(error):
+    """The field ('username' or 'email') whose uniqueness an IntegrityError reports, if any."""
+    message = str(error.orig)
+    for marker, field in USER_UNIQUE_FIELDS.items():
+        if marker in message:
+            return field
+    return None
+
+
+def user_conflict(error):
+    field = conflicting_field(error)
+    body = {'error': 'User with that username or email already exists'}
+    if field:
+        body['field'] = field
+    return jsonify(body), 409
+
+
+def load_user_includes(users, include):
+    """Load each user's latest posts in a single query when include=posts."""
+    if 'posts' not in include:
+        return {}
+    return {'posts': latest_children(BlogPost, 'author_id', [user.id for user in users],
+                                     include_limit('posts'))}
+
+
+def users_by_ids():
+    """Respond with the users asked for by id, in the order asked, plus the ids not found."""
+    try:
+        ids = requested_ids()
+        include = parse_include(USER_INCLUDES)
+        fields = parse_fields(user_serializer.fields)
+    except InvalidIds as e:
+        return jsonify({'error': str(e)}), 400
+    except InvalidInclude as e:
+        return jsonify({'error': f'Unknown include: {e}'}), 400
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
+
+    query = User.query
+    if fields:
+        query = query.options(load_only_fields(User, fields))
+    users, missing = fetch_by_ids(query, User, ids)
+
+    embeds = load_user_includes(users, include)
+    etag = collection_etag(users + list(embedded_rows(embeds)), missing, sorted(include), fields)
+    cached = not_modified(etag, weak=True)
+    if cached:
+        return cached
+
+    return with_etag(jsonify({
+        'users': embed(user_serializer.dump_many(users, fields), users, embeds, USER_INCLUDES),
+        'missing': missing
+    }), etag, weak=True), 200
 
 # Create user
 @user_bp.route('/users', methods=['POST'])
@@ -31,17 +106,11 @@ def create_user():
     if '@' not in email:
         return jsonify({'message': 'Invalid email address'}), 400
 
-    # Check if username or email already exists
-    existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
-    if existing_user:
-        return jsonify({'error': 'User with that username or email already exists'}), 409
-
-    # Hash the password
-    hashed_password = generate_password_hash(password)
+    # Hash the password (in the hashing pool, so other requests keep running)
+    hashed_password = password_hasher.hash(password)
 
     # Create a new user
     new_user = User(
-        id=uuid.uuid4(),
         username=username,
         email=email,
         password=hashed_password,
@@ -50,28 +119,105 @@ def create_user():
         role=role
     )
 
-    db.session.add(new_user)
-    db.session.commit()
+    # One INSERT: the unique indexes on lower(username) and lower(email) catch
+    # taken names, also when two registrations race
+    try:
+        db.session.add(new_user)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return user_conflict(e)
+
+    return jsonify({'message': 'User created successfully', **user_detail_serializer.dump(new_user)}), 201
+
+
+
+# Create many users in one transaction
+@user_bp.route('/users:batch', methods=['POST'])
+@jwt_required()
+def create_users_batch():
+    from api.models.blogmodels import db
+    from api.app import app
+    items, error = batch_items(request.get_json(silent=True), 'users')
+    if error:
+        return error
+
+    results = [None] * len(items)
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+    for index, item in enumerate(items):
+        invalid = invalid_item(index, item, ('username', 'email', 'password', 'firstname', 'lastname'),
+                               optional=('role',))
+        if invalid:
+            results[index] = invalid
+        elif '@' not in item['email']:
+            results[index] = failure(index, 400, 'Invalid email address')
+        elif item['username'].lower() in seen_usernames or item['email'].lower() in seen_emails:
+            results[index] = failure(index, 409, 'Duplicate username or email in batch')
+        else:
+            seen_usernames.add(item['username'].lower())
+            seen_emails.add(item['email'].lower())
+            candidates.append((index, item))
 
-    return jsonify({
-        'message': 'User created successfully',
-        'id': new_user.id,
-        'username': new_user.username,
-        'email': new_user.email,
-        'firstname': new_user.firstname,
-        'lastname': new_user.lastname,
-        'role': new_user.role,
-        'created_at': new_user.created_at
-    }), 201
+    try:
+        # One query for every username/email collision in the batch, served
+        # by the lower() indexes; uniqueness is case-insensitive
+        taken_usernames, taken_emails = set(), set()
+        if candidates:
+            for username, email in db.session.execute(
+                    db.select(func.lower(User.username), func.lower(User.email)).where(
+                        func.lower(User.username).in_(seen_usernames) | func.lower(User.email).in_(seen_emails))):
+                taken_usernames.add(username)
+                taken_emails.add(email)
+
+        accepted = []
+        for index, item in candidates:
+            if item['username'].lower() in taken_usernames or item['email'].lower() in taken_emails:
+                results[index] = failure(index, 409, 'User with that username or email already exists')
+            else:
+                accepted.append((index, item))
+
+        # Hash the whole batch concurrently across the hashing pool
+        hashes = password_hasher.hash_many([item['password'] for _, item in accepted])
+
+        rows, indexes = [], []
+        for (index, item), hashed_password in zip(accepted, hashes):
+            rows.append({
+                'username': item['username'],
+                'email': item['email'],
+                'password': hashed_password,
+                'firstname': item['firstname'],
+                'lastname': item['lastname'],
+                'role': item.get('role', 'user')
+            })
+            indexes.append(index)
+
+        for index, row in zip(indexes, insert_rows(User, rows)):
+            results[index] = {'index': index, 'status': 201, 'id': str(row.id)}
+        db.session.commit()
+
+        return batch_response(results)
+
+    except IntegrityError as e:
+        # Lost a race with a concurrent registration; nothing was inserted
+        db.session.rollback()
+        return user_conflict(e)
 
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        app.logger.error(f"Database error: {e}")
+        return jsonify({'error': 'Database error occurred'}), 500
 
 
 # Route to get users with pagination and authentication
-user_schema = UserSchema(many=True)
 @user_bp.route('/users', methods=['GET'])
 @jwt_required()
 def get_users():
     try:
+        # ?ids=a,b,c fetches those users instead of a page
+        if 'ids' in request.args:
+            return users_by_ids()
+
         # Pagination parameters
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 10, type=int)
@@ -79,9 +225,53 @@ def get_users():
         if page < 1 or per_page < 1:
             return jsonify({'error': 'Invalid pagination parameters'}), 400
 
+        per_page = clamp_per_page(per_page)
+
+        try:
+            include = parse_include(USER_INCLUDES)
+            fields = parse_fields(user_serializer.fields)
+            count = parse_count('users')
+        except InvalidInclude as e:
+            return jsonify({'error': f'Unknown include: {e}'}), 400
+        except InvalidFields as e:
+            return jsonify({'error': f'Unknown fields: {e}'}), 400
+        except InvalidCountMode as e:
+            return jsonify({'error': f'Invalid count: {e}'}), 400
+
+        query = User.query
+        if fields:
+            query = query.options(load_only_fields(User, fields))
+
+        # Cursor mode: seek by (created_at, id) instead of OFFSET/COUNT
+        if 'cursor' in request.args:
+            try:
+                users, next_cursor = keyset_paginate(query, User,
+                                                     request.args.get('cursor'), per_page)
+            except InvalidCursor:
+                return jsonify({'error': 'Invalid cursor'}), 400
+
+            embeds = load_user_includes(users, include)
+            etag = collection_etag(users + list(embedded_rows(embeds)), next_cursor, sorted(include), fields)
+            cached = not_modified(etag, weak=True)
+            if cached:
+                return cached
+
+            return with_etag(jsonify({
+                'users': embed(user_serializer.dump_many(users, fields), users, embeds, USER_INCLUDES),
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            }), etag, weak=True), 200
+
         # Fetch users with pagination
-        users = User.query.paginate(page=page, per_page=per_page, error_out=False)
-        result = user_schema.dump(users.items)  # Use schema to dump data
+        users = paginate(query, page, per_page, count, lambda: estimated_count(User))
+
+        embeds = load_user_includes(users.items, include)
+        etag = collection_etag(users.items + list(embedded_rows(embeds)), users.total, page, per_page,
+                               sorted(include), fields)
+        cached = not_modified(etag, weak=True)
+        if cached:
+            return cached
+        result = embed(user_serializer.dump_many(users.items, fields), users.items, embeds, USER_INCLUDES)
 
         # Add pagination metadata
         response = {
@@ -89,31 +279,59 @@ def get_users():
             'total': users.total,
             'pages': users.pages,
             'current_page': users.page,
-            'next_page': users.next_num if users.has_next else None,
-            'prev_page': users.prev_num if users.has_prev else None
+            'next_page': users.next_page,
+            'prev_page': users.prev_page
         }
-        return jsonify(response), 200
+        return with_etag(jsonify(response), etag, weak=True), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# Fetch users by id, with the list in the body
+@user_bp.route('/users:lookup', methods=['POST'])
+@jwt_required()
+def lookup_users():
+    try:
+        return users_by_ids()
+    except SQLAlchemyError as e:
+        return jsonify({'error': 'Database error occurred'}), 500
+
+# Stream every user as NDJSON (without password hashes)
+@user_bp.route('/users/export', methods=['GET'])
+@jwt_required()
+def export_users():
+    return ndjson_response('users')
+
 # get a user
 @user_bp.route('/users/<string:user_id>', methods=['GET'])
 @jwt_required()
 def get_user(user_id):
     try:
-        user = User.query.get_or_404(user_id)
-
-        user_data = {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'firstname': user.firstname,
-            'lastname': user.lastname,
-            'role': user.role,
-            'created_at': user.created_at
-        }
+        include = parse_include(USER_INCLUDES)
+        fields = parse_fields(user_detail_serializer.fields)
+    except InvalidInclude as e:
+        return jsonify({'error': f'Unknown include: {e}'}), 400
+    except InvalidFields as e:
+        return jsonify({'error': f'Unknown fields: {e}'}), 400
 
-        return jsonify(user_data), 200
+    try:
+        user = model_cache.get_or_404(User, user_id)
+
+        embeds = load_user_includes([user], include)
+        if include:
+            etag, weak = collection_etag([user, *embedded_rows(embeds)], sorted(include), fields), True
+        else:
+            etag, weak = (object_etag(user, fields) if fields else object_etag(user)), False
+        cached = not_modified(etag, weak=weak)
+        if cached:
+            return cached
+
+        user_data = user_detail_serializer.dump(user, fields)
+        embed([user_data], [user], embeds, USER_INCLUDES)
+
+        return with_etag(jsonify(user_data), etag, weak=weak), 200
+
+    except NotFound:
+        raise
 
     except SQLAlchemyError as e:
         return jsonify({'error': 'Database error occurred'}), 500
@@ -127,9 +345,9 @@ def get_user(user_id):
 @jwt_required()
 def update_user(user_id):
     from api.models.blogmodels import db
-    try:
-        user_id = UUID(user_id, version=4)
-    except ValueError:
+    # Any UUID version: ids are v4 for older users and v7 for newer ones
+    user_id = to_uuid(user_id)
+    if user_id is None:
         return jsonify({"msg": "Invalid user ID format"}), 400
 
     user = User.query.get(user_id)
@@ -147,13 +365,7 @@ def update_user(user_id):
 
     db.session.commit()
 
-    return jsonify({
-        'id': str(user.id),
-        'username': user.username,
-        'email': user.email,
-        'is_active': user.is_active,
-        'role': user.role
-    }), 200
+    return jsonify(user_serializer.dump(user)), 200
 
 # Delete a user
 @user_bp.route('/users/<string:user_id>', methods=['DELETE'])
@@ -183,6 +395,7 @@ def delete_user(user_id):
 # Route for creating an access token for testing purposes
 @user_bp.route('/login', methods=['POST'])
 def login():
+    from api.models.blogmodels import db
     from api.app import app
     data = request.get_json()
     app.logger.info(f"Received login data: {data}")
@@ -193,10 +406,22 @@ def login():
     if not identifier or not password:
         return jsonify({'message': 'Missing required fields'}), 400
 
-    user = User.query.filter((User.username == identifier) | (User.email == identifier)).first()
+    # Case-insensitive, and each side of the OR is an index scan on lower(...)
+    lowered = func.lower(identifier)
+    user = User.query.filter((func.lower(User.username) == lowered) | (func.lower(User.email) == lowered)).first()
 
     if user and user.check_password(password):
-        access_token = create_access_token(identity=user.username)
+        # Upgrade hashes made with older PASSWORD_HASH_METHOD settings while we know the password
+        if password_hasher.needs_rehash(user.password):
+            try:
+                user.set_password(password)
+                db.session.commit()
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                app.logger.error(f"Failed to rehash password: {e}")
+
+        # Claims carry the user id and role (see api.utils.auth.init_jwt)
+        access_token = create_access_token(identity=user)
         return jsonify(access_token=access_token, message='Login successful'), 200
     else:
         return jsonify({'message': 'Invalid username/email or password'}), 401
@@ -4,6 +4,9 @@ class BlogPostSchema(Schema):
     id = fields.UUID(required=True)
     title = fields.Str(required=True)
     content = fields.Str(required=True)
+    excerpt = fields.Str(dump_only=True)
     created_at = fields.DateTime(format='%Y-%m-%d %H:%M:%S', required=True)
     updated_at = fields.DateTime(format='%Y-%m-%d %H:%M:%S', allow_none=True)
     author_id = fields.UUID(required=True)
+    comment_count = fields.Int(dump_only=True)
+    last_comment_at = fields.DateTime(format='%Y-%m-%d %H:%M:%S', allow_none=True, dump_only=True)
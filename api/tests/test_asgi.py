@@ -0,0 +1,111 @@
+from datetime import timedelta
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('httpx')
+
+from flask_jwt_extended import create_access_token
+from starlette.testclient import TestClient
+from api.asgi import app as asgi_app
+from api.models.blogmodels import db, User, BlogPost, Comment
+
+
+@pytest.fixture
+def asgi_client(client):
+    with TestClient(asgi_app) as asgi_client:
+        yield asgi_client
+
+
+def test_asgi_responses_match_flask(client, asgi_client):
+    user = User(username='asgi', email='asgi@example.com', firstname='A', lastname='Sgi')
+    user.set_password('asgi-password')
+    db.session.add(user)
+    db.session.commit()
+    posts = [BlogPost(title=f'Post {i}', content='Body', author_id=user.id) for i in range(3)]
+    db.session.add_all(posts)
+    db.session.commit()
+    comments = [Comment(blog_post_id=posts[0].id, user_id=user.id, comment=f'Comment {i}') for i in range(3)]
+    db.session.add_all(comments)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+
+    # Every read route the ASGI app shares with the Flask app, in each paging mode
+    for url in ('/api/v1/blog_posts', '/api/v1/blog_posts?per_page=2', '/api/v1/blog_posts?per_page=2&page=2',
+                '/api/v1/blog_posts?per_page=2&cursor=', f'/api/v1/blog_posts/{posts[0].id}',
+                f'/api/v1/blog_posts/{posts[0].id}/comments?per_page=2',
+                f'/api/v1/blog_posts/{posts[0].id}/comments?per_page=2&page=2',
+                f'/api/v1/blog_posts/{posts[0].id}/comments?per_page=2&cursor=',
+                f'/api/v1/comments/{comments[0].id}',
+                '/api/v1/users', '/api/v1/users?per_page=1&cursor=', f'/api/v1/users/{user.id}'):
+        flask_response = client.get(url, headers=headers)
+        asgi_response = asgi_client.get(url, headers=headers)
+        assert asgi_response.status_code == flask_response.status_code == 200, url
+        assert asgi_response.json() == flask_response.json, url
+
+    # Parameters only the Flask app implements are refused, not ignored
+    response = asgi_client.get(f'/api/v1/blog_posts?ids={posts[0].id}', headers=headers)
+    assert response.status_code == 400
+    assert asgi_client.get('/api/v1/users?fields=id', headers=headers).status_code == 400
+
+    # Rejections and misses get the Flask app's statuses and bodies
+    expired = {'Authorization': f'Bearer {create_access_token(identity=user, expires_delta=timedelta(seconds=-1))}'}
+    for url, request_headers in (('/api/v1/blog_posts', {}),
+                                 ('/api/v1/blog_posts', expired),
+                                 ('/api/v1/blog_posts', {'Authorization': 'Bearer not-a-token'}),
+                                 ('/api/v1/blog_posts', {'Authorization': 'Basic abc'}),
+                                 ('/api/v1/blog_posts/not-a-uuid', headers),
+                                 (f'/api/v1/comments/{posts[0].id}', headers),
+                                 ('/api/v1/nowhere', headers)):
+        flask_response = client.get(url, headers=request_headers)
+        asgi_response = asgi_client.get(url, headers=request_headers)
+        assert asgi_response.status_code == flask_response.status_code, (url, request_headers)
+        assert asgi_response.content == flask_response.data, (url, request_headers)
+    assert client.get('/api/v1/blog_posts', headers=expired).json == {'msg': 'Token has expired'}
+
+
+def test_asgi_login_and_create_comment(client, asgi_client):
+    user = User(username='asgi', email='asgi@example.com', firstname='A', lastname='Sgi')
+    user.set_password('asgi-password')
+    db.session.add(user)
+    db.session.commit()
+
+    response = asgi_client.post('/api/v1/login', json={'identifier': 'asgi', 'password': 'asgi-password'})
+    assert response.status_code == 200
+    headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    response = asgi_client.post('/api/v1/blog_posts', json={
+        'title': 'Async', 'content': 'Body', 'author_id': str(user.id)
+    }, headers=headers)
+    assert response.status_code == 201
+    post_id = response.json()['post']['id']
+
+    response = asgi_client.post('/api/v1/comments', json={
+        'blog_post_id': post_id, 'user_id': str(user.id), 'comment': 'Hi'
+    }, headers=headers)
+    assert response.status_code == 201
+    assert response.json()['comment']['created_at'] is not None
+
+    # The token works against the Flask app too
+    response = client.get(f'/api/v1/blog_posts/{post_id}', headers=headers)
+    assert response.json['comment_count'] == 1
+
+
+def test_asgi_create_reply(client, asgi_client):
+    user = User(username='asgi', email='asgi@example.com', firstname='A', lastname='Sgi')
+    user.set_password('asgi-password')
+    db.session.add(user)
+    db.session.commit()
+    post = BlogPost(title='Threaded', content='Body', author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+    comment = {'blog_post_id': str(post.id), 'user_id': str(user.id), 'comment': 'Hi'}
+
+    root = asgi_client.post('/api/v1/comments', json=comment, headers=headers).json()['comment']['id']
+    response = asgi_client.post('/api/v1/comments', json={**comment, 'parent_id': root}, headers=headers)
+    assert response.status_code == 201
+    assert (response.json()['comment']['parent_id'], response.json()['comment']['depth']) == (root, 1)
+
+    response = asgi_client.post('/api/v1/comments', json={**comment, 'parent_id': str(post.id)}, headers=headers)
+    assert response.status_code == 404
@@ -1,8 +1,12 @@
+import json
+import uuid
 import pytest
+from sqlalchemy import event, text
 from api.app import app
-from api.models.blogmodels import db, User
+from api.models.blogmodels import db, User, BlogPost, Comment
 from api.config import TestConfig
 from flask_jwt_extended import create_access_token
+from api.utils.cache import model_cache
 
 
 @pytest.fixture
@@ -57,6 +61,25 @@ def test_create_blog_post(client, auth_headers):
     assert response.json['error'] == 'Missing required fields'
 
 
+def test_create_blog_posts_batch(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    response = client.post('/api/v1/blog_posts:batch', json={'posts': [
+        {'title': 'First', 'content': 'Body', 'author_id': str(author.id)},
+        {'title': 'No content', 'author_id': str(author.id)},
+        {'title': 'Orphan', 'content': 'Body', 'author_id': '00000000-0000-4000-8000-000000000000'},
+        {'title': 'Second', 'content': 'Body', 'author_id': str(author.id)},
+        {'title': 'Typed', 'content': ['Body'], 'author_id': str(author.id)},
+    ]}, headers=auth_headers)
+    assert response.status_code == 207
+    assert response.json['created'] == 2
+    assert [result['status'] for result in response.json['results']] == [201, 400, 404, 201, 400]
+    assert response.json['results'][4]['error'] == 'Fields must be strings'
+    assert BlogPost.query.count() == 2
+
+    # Not a list
+    response = client.post('/api/v1/blog_posts:batch', json={'posts': {}}, headers=auth_headers)
+    assert response.status_code == 400
+
 def test_get_blog_posts(client, auth_headers):
     response = client.get('/api/v1/blog_posts?page=1&per_page=10', headers=auth_headers)
     assert response.status_code == 200
@@ -67,6 +90,293 @@ def test_get_blog_posts(client, auth_headers):
     assert response.status_code == 400
     assert response.json['error'] == 'Invalid pagination parameters'
 
+def test_get_blog_posts_cursor_pagination(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    db.session.add_all([BlogPost(title=f'Post {i}', content='Body', author_id=author.id) for i in range(7)])
+    db.session.commit()
+
+    response = client.get('/api/v1/blog_posts?cursor=&per_page=5', headers=auth_headers)
+    assert response.status_code == 200
+    first_page = response.json
+    assert len(first_page['posts']) == 5
+    assert first_page['next_cursor']
+
+    response = client.get(f"/api/v1/blog_posts?cursor={first_page['next_cursor']}&per_page=5",
+                          headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json['posts']) == 2
+    assert response.json['next_cursor'] is None
+
+    ids = {post['id'] for post in first_page['posts'] + response.json['posts']}
+    assert len(ids) == 7
+
+def test_get_blog_posts_count_modes(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    db.session.add_all([BlogPost(title=f'Post {i}', content='Body', author_id=author.id) for i in range(7)])
+    db.session.commit()
+    model_cache.backend.delete('count:blog_posts')
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get('/api/v1/blog_posts?per_page=5&count=none', headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200
+    assert len(response.json['posts']) == 5
+    assert (response.json['total'], response.json['pages'], response.json['next_page']) == (None, None, 2)
+    assert not any(statement.startswith('SELECT count') for statement in statements)
+
+    response = client.get('/api/v1/blog_posts?page=2&per_page=5&count=none', headers=auth_headers)
+    assert len(response.json['posts']) == 2 and response.json['next_page'] is None
+
+    # SQLite has no planner estimate, so the count is computed once and cached
+    response = client.get('/api/v1/blog_posts?per_page=5&count=estimate', headers=auth_headers)
+    assert (response.json['total'], response.json['pages']) == (7, 2)
+    db.session.add(BlogPost(title='Post 8', content='Body', author_id=author.id))
+    db.session.commit()
+    response = client.get('/api/v1/blog_posts?per_page=5&count=estimate', headers=auth_headers)
+    assert response.json['total'] == 7
+    assert client.get('/api/v1/blog_posts?per_page=5', headers=auth_headers).json['total'] == 8
+
+    response = client.get('/api/v1/blog_posts?count=roughly', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_get_blog_post_etag(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    post = BlogPost(title='Cached', content='Body', author_id=author.id)
+    db.session.add(post)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/blog_posts/{post.id}', headers=auth_headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+
+    response = client.get(f'/api/v1/blog_posts/{post.id}',
+                          headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    response = client.get(f'/api/v1/blog_posts/{post.id}',
+                          headers={**auth_headers, 'If-None-Match': '"stale"'})
+    assert response.status_code == 200
+
+def test_get_blog_posts_weak_etag(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    db.session.add(BlogPost(title='Listed', content='Body', author_id=author.id))
+    db.session.commit()
+
+    response = client.get('/api/v1/blog_posts?page=1&per_page=10', headers=auth_headers)
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+
+    response = client.get('/api/v1/blog_posts?page=1&per_page=10',
+                          headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    db.session.add(BlogPost(title='Another', content='Body', author_id=author.id))
+    db.session.commit()
+    response = client.get('/api/v1/blog_posts?page=1&per_page=10',
+                          headers={**auth_headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert len(response.json['posts']) == 2
+
+def test_get_blog_posts_include(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    posts = [BlogPost(title=f'Post {i}', content='Body', author_id=author.id) for i in range(3)]
+    db.session.add_all(posts)
+    db.session.commit()
+    db.session.add_all([Comment(blog_post_id=post.id, user_id=author.id, comment=f'{post.title} comment {i}')
+                        for post in posts for i in range(4)])
+    db.session.commit()
+    app.config['INCLUDE_MAX_COMMENTS'] = 2
+
+    statements = []
+    def count(*args):
+        statements.append(args)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        client.get('/api/v1/blog_posts?per_page=10', headers=auth_headers)
+        plain = len(statements)
+        statements.clear()
+        response = client.get('/api/v1/blog_posts?per_page=10&include=author,comments', headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 200
+    # One query per relationship for the whole page, not per post
+    assert len(statements) == plain + 2
+    for post in response.json['posts']:
+        assert post['author']['username'] == 'testuser'
+        assert len(post['comments']) == 2
+        assert all(comment['blog_post_id'] == post['id'] for comment in post['comments'])
+
+    response = client.get(f'/api/v1/blog_posts/{posts[0].id}?include=comments', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('W/')
+    assert len(response.json['comments']) == 2
+    assert 'author' not in response.json
+
+    response = client.get('/api/v1/blog_posts?include=password', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_get_blog_posts_by_ids(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    posts = [BlogPost(title=f'Post {i}', content='Body', author_id=author.id) for i in range(3)]
+    db.session.add_all(posts)
+    db.session.commit()
+    ids = [str(posts[2].id), 'not-an-id', str(posts[0].id), str(uuid.uuid4())]
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get(f"/api/v1/blog_posts?ids={','.join(ids)}&fields=id,title", headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200
+    assert [post['title'] for post in response.json['posts']] == ['Post 2', 'Post 0']
+    assert response.json['missing'] == ids[1::2]
+    assert len([statement for statement in statements if 'FROM blog_posts' in statement]) == 1
+
+    response = client.post('/api/v1/blog_posts:lookup?include=author', json={'ids': ids[:3]},
+                           headers=auth_headers)
+    assert response.status_code == 200
+    assert [post['id'] for post in response.json['posts']] == ids[:3:2]
+    assert response.json['posts'][0]['author']['username'] == 'testuser'
+
+    app.config['MULTIGET_MAX_IDS'] = 2
+    try:
+        response = client.post('/api/v1/blog_posts:lookup', json={'ids': ids}, headers=auth_headers)
+        assert response.status_code == 400
+    finally:
+        app.config['MULTIGET_MAX_IDS'] = 100
+    assert client.get('/api/v1/blog_posts?ids=', headers=auth_headers).status_code == 400
+
+def test_get_blog_posts_fields(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    long_post = BlogPost(title='Long', content='word ' * 200, author_id=author.id)
+    db.session.add(long_post)
+    db.session.commit()
+    client.post('/api/v1/blog_posts:batch', json={'posts': [
+        {'title': 'Short', 'content': '  Short   body  ', 'author_id': str(author.id)}
+    ]}, headers=auth_headers)
+    db.session.expire_all()
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.get('/api/v1/blog_posts?fields=id,title,excerpt', headers=auth_headers)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+    assert response.status_code == 200
+    posts = {post['title']: post for post in response.json['posts']}
+    assert set(posts['Long']) == {'id', 'title', 'excerpt'}
+    assert posts['Long']['excerpt'].endswith('...') and len(posts['Long']['excerpt']) <= 283
+    assert posts['Short']['excerpt'] == 'Short body'
+    # The page query skips content (paginate's COUNT wraps all columns, but reads none of them)
+    pages = [statement for statement in statements if not statement.startswith('SELECT count')]
+    assert pages and not any('blog_posts.content' in statement for statement in pages)
+
+    # Edits refresh the excerpt
+    long_post.content = 'Rewritten'
+    db.session.commit()
+    response = client.get(f'/api/v1/blog_posts/{long_post.id}?fields=excerpt', headers=auth_headers)
+    assert response.json == {'excerpt': 'Rewritten'}
+
+    response = client.get('/api/v1/blog_posts?fields=title,password', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_export_blog_posts(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    db.session.add_all([BlogPost(title=f'Export {i}', content='Body', author_id=author.id) for i in range(3)])
+    db.session.commit()
+
+    response = client.get('/api/v1/blog_posts/export', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(row['title'] for row in rows) == ['Export 0', 'Export 1', 'Export 2']
+    assert response.headers['X-Export-Started-At']
+
+    # Incremental export: no rows were written after this timestamp
+    response = client.get('/api/v1/blog_posts/export', query_string={'since': '2999-01-01T00:00:00'},
+                          headers=auth_headers)
+    assert response.get_data(as_text=True) == ''
+
+    response = client.get('/api/v1/blog_posts/export?since=yesterday', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_search_blog_posts(client, auth_headers):
+    author = User.query.filter_by(username='testuser').first()
+    db.session.add_all([
+        BlogPost(title='Postgres indexing', content='GIN indexes make full text search fast.', author_id=author.id),
+        BlogPost(title='Gardening', content='Tomatoes need sun. Also a note on search.', author_id=author.id),
+        BlogPost(title='Cooking', content='Nothing relevant here.', author_id=author.id),
+        BlogPost(title='Markup', content='<script>alert(1)</script> & a zebra', author_id=author.id),
+    ])
+    db.session.commit()
+
+    response = client.get('/api/v1/blog_posts/search?q=search&per_page=1', headers=auth_headers)
+    assert response.status_code == 200
+    first = response.json
+    assert len(first['results']) == 1
+    assert '<mark>search</mark>' in first['results'][0]['snippet']
+
+    response = client.get(f"/api/v1/blog_posts/search?q=search&per_page=1&cursor={first['next_cursor']}",
+                          headers=auth_headers)
+    second = response.json
+    assert len(second['results']) == 1
+    assert second['next_cursor'] is None
+    assert {first['results'][0]['title'], second['results'][0]['title']} == {'Postgres indexing', 'Gardening'}
+    assert first['results'][0]['rank'] >= second['results'][0]['rank']
+
+    # Edits are reindexed
+    post = BlogPost.query.filter_by(title='Cooking').first()
+    post.content = 'Now about search too.'
+    db.session.commit()
+    response = client.get('/api/v1/blog_posts/search?q=search', headers=auth_headers)
+    assert len(response.json['results']) == 3
+
+    # Content is escaped; only the highlighting is markup
+    response = client.get('/api/v1/blog_posts/search?q=zebra', headers=auth_headers)
+    assert response.json['results'][0]['snippet'] == \
+        '&lt;script&gt;alert(1)&lt;/script&gt; &amp; a <mark>zebra</mark>'
+
+    response = client.get('/api/v1/blog_posts/search', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_search_survives_rowid_changes(client, auth_headers):
+    if db.engine.dialect.name != 'sqlite':
+        pytest.skip('SQLite FTS5 fallback only')
+    author = User.query.filter_by(username='testuser').first()
+    posts = [BlogPost(title=title, content=content, author_id=author.id)
+             for title, content in (('Apples', 'apple orchard'), ('Bananas', 'banana plantation'),
+                                    ('Cherries', 'cherry blossom'))]
+    db.session.add_all(posts)
+    db.session.commit()
+    db.session.delete(posts[0])
+    db.session.commit()
+
+    # Renumber the hidden rowids, as VACUUM may for a table without an integer key
+    db.session.execute(text('UPDATE blog_posts SET rowid = rowid - 1'))
+    db.session.commit()
+
+    for word, title in (('banana', 'Bananas'), ('cherry', 'Cherries')):
+        response = client.get(f'/api/v1/blog_posts/search?q={word}', headers=auth_headers)
+        assert [result['title'] for result in response.json['results']] == [title]
+
 def test_get_blog_post(client, auth_headers):
     response = client.get('/api/v1/blog_posts/valid-post-id', headers=auth_headers)
     assert response.status_code == 200
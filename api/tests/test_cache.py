@@ -0,0 +1,110 @@
+import time
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from api.models.blogmodels import db, User, BlogPost
+from api.utils.cache import MemoryCache, ModelCache, model_cache
+
+
+@pytest.fixture
+def post_id(client):
+    model_cache.backend.clear()
+    author = User(username='cached', email='cached@example.com', password='password',
+                  firstname='Cached', lastname='Author')
+    db.session.add(author)
+    db.session.commit()
+    post = BlogPost(title='Cached post', content='Body', author_id=author.id)
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+    db.session.expunge_all()
+    return post_id
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set('a', 1, ttl=60)
+    cache.set('b', 2, ttl=60)
+    assert cache.get('a') == 1
+    cache.set('c', 3, ttl=60)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache()
+    cache.set('a', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get('a') is None
+
+
+def test_model_cache_hit_skips_database(post_id):
+    assert model_cache.get(BlogPost, post_id).title == 'Cached post'
+    db.session.expunge_all()
+
+    with captured_statements() as statements:
+        cached = model_cache.get(BlogPost, str(post_id))
+        assert cached.title == 'Cached post'
+    assert statements == []
+
+
+def test_model_cache_invalidated_on_commit(post_id):
+    post = model_cache.get(BlogPost, post_id)
+    post.title = 'Renamed'
+    db.session.commit()
+    db.session.expunge_all()
+
+    assert model_cache.get(BlogPost, post_id).title == 'Renamed'
+
+    db.session.delete(model_cache.get(BlogPost, post_id))
+    db.session.commit()
+    assert model_cache.get(BlogPost, post_id) is None
+
+
+def test_model_cache_malformed_id(client):
+    assert model_cache.get(BlogPost, 'not-a-uuid') is None
+
+
+def test_fill_skipped_after_concurrent_invalidation(post_id):
+    key = ModelCache.key(BlogPost, post_id)
+
+    # Another request commits a change while this one is reading the row
+    def invalidate(conn, cursor, statement, parameters, context, executemany):
+        model_cache.invalidate(BlogPost, post_id)
+
+    event.listen(db.engine, 'before_cursor_execute', invalidate)
+    try:
+        assert model_cache.get(BlogPost, post_id).title == 'Cached post'
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', invalidate)
+    assert model_cache.backend.get(key) is None
+
+    # The next miss starts from the new generation and fills as usual
+    db.session.expunge_all()
+    model_cache.get(BlogPost, post_id)
+    assert model_cache.backend.get(key)['title'] == 'Cached post'
+
+
+def test_password_not_cached(post_id):
+    author_id = db.session.get(BlogPost, post_id).author_id
+    db.session.expunge_all()
+    model_cache.get(User, author_id)
+    assert 'password' not in model_cache.backend.get(ModelCache.key(User, author_id))
+
+    db.session.expunge_all()
+    assert model_cache.get(User, author_id).password == 'password'
@@ -42,6 +42,215 @@ def auth_headers(client):
     token = create_access_token(identity=user.id)
     return {'Authorization': f'Bearer {token}'}
 
+def test_create_comments_batch(client, auth_headers):
+    user = User.query.filter_by(username='testuser').first()
+    post = BlogPost(title='Post', content='Body', author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+
+    response = client.post('/api/v1/comments:batch', json={'comments': [
+        {'blog_post_id': str(post.id), 'user_id': str(user.id), 'comment': f'Comment {i}'}
+        for i in range(3)
+    ]}, headers=auth_headers)
+    assert response.status_code == 201
+    assert response.json['created'] == 3
+    assert Comment.query.filter_by(blog_post_id=post.id).count() == 3
+
+    ids = [result['id'] for result in reversed(response.json['results'])]
+    response = client.get(f"/api/v1/comments?ids={','.join(ids)}", headers=auth_headers)
+    assert [comment['comment'] for comment in response.json['comments']] == ['Comment 2', 'Comment 1', 'Comment 0']
+    response = client.post('/api/v1/comments:lookup', json={'ids': ids[:1] + [ids[0][::-1]]}, headers=auth_headers)
+    assert len(response.json['comments']) == 1 and response.json['missing'] == [ids[0][::-1]]
+
+def test_comment_counters(client):
+    admin = User(username='admin', email='admin@example.com', firstname='Ad', lastname='Min', role='admin')
+    admin.set_password('password')
+    db.session.add(admin)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(admin.id))}'}
+    post = BlogPost(title='Counted', content='Body', author_id=admin.id)
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+
+    def etags():
+        return (client.get(f'/api/v1/blog_posts/{post_id}', headers=headers).headers['ETag'],
+                client.get('/api/v1/blog_posts?per_page=5', headers=headers).headers['ETag'])
+
+    def modified(tags):
+        return [client.get(url, headers={**headers, 'If-None-Match': tag}).status_code
+                for url, tag in zip((f'/api/v1/blog_posts/{post_id}', '/api/v1/blog_posts?per_page=5'), tags)]
+
+    before = etags()
+    comment_ids = []
+    for text in ('first', 'second'):
+        response = client.post('/api/v1/comments', json={
+            'blog_post_id': str(post_id), 'user_id': str(admin.id), 'comment': text
+        }, headers=headers)
+        assert response.status_code == 201
+        comment_ids.append(response.json['comment']['id'])
+
+    response = client.get(f'/api/v1/blog_posts/{post_id}', headers=headers)
+    assert response.json['comment_count'] == 2
+    assert response.json['last_comment_at'] is not None
+    # Counting comments doesn't mark the post as edited, but does change its ETags
+    assert db.session.scalar(db.select(BlogPost.updated_at).where(BlogPost.id == post_id)) is None
+    assert modified(before) == [200, 200]
+
+    after_adding = etags()
+    response = client.delete(f'/api/v1/comments/{comment_ids[0]}', headers=headers)
+    assert response.status_code == 200
+    response = client.get(f'/api/v1/blog_posts/{post_id}', headers=headers)
+    assert response.json['comment_count'] == 1
+    assert modified(after_adding) == [200, 200]
+
+    # Drift introduced behind the app's back is fixed by the repair command
+    db.session.execute(db.update(BlogPost).values(comment_count=42, last_comment_at=None, updated_at=None))
+    db.session.commit()
+    result = client.application.test_cli_runner().invoke(args=['repair-comment-counts', '--batch-size', '1'])
+    assert result.exit_code == 0, result.output
+    db.session.expire_all()
+    post = db.session.get(BlogPost, post_id)
+    assert post.comment_count == 1
+    assert post.last_comment_at is not None
+    assert post.updated_at is None
+
+def test_comment_writes_skip_cached_copy(client):
+    user = User(username='deleter', email='deleter@example.com', firstname='De', lastname='Leter')
+    user.set_password('password')
+    db.session.add(user)
+    db.session.commit()
+    headers = {'Authorization': f'Bearer {create_access_token(identity=str(user.id))}'}
+    post = BlogPost(title='Gone', content='Body', author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+    response = client.post('/api/v1/comments', json={
+        'blog_post_id': str(post.id), 'user_id': str(user.id), 'comment': 'soon gone'
+    }, headers=headers)
+    comment_id = response.json['comment']['id']
+    assert client.get(f'/api/v1/comments/{comment_id}', headers=headers).status_code == 200
+
+    # Deleted where this process's cache can't see it, e.g. by another worker
+    db.session.execute(db.delete(Comment))
+    db.session.commit()
+    db.session.expunge_all()
+
+    response = client.put(f'/api/v1/comments/{comment_id}', json={'comment': 'edited'}, headers=headers)
+    assert response.status_code == 404
+    response = client.delete(f'/api/v1/comments/{comment_id}', headers=headers)
+    assert response.status_code == 404
+
+def test_comment_threads(client, auth_headers):
+    user = User.query.filter_by(username='testuser').first()
+    post = BlogPost(title='Threaded', content='Body', author_id=user.id)
+    db.session.add(post)
+    db.session.commit()
+    post_id, user_id = str(post.id), str(user.id)
+
+    def reply(text, parent_id=None):
+        response = client.post('/api/v1/comments', json={
+            'blog_post_id': post_id, 'user_id': user_id, 'comment': text, 'parent_id': parent_id
+        }, headers=auth_headers)
+        assert response.status_code == 201, response.json
+        return response.json['comment']['id']
+
+    first = reply('first')
+    first_a = reply('first a', first)
+    first_a_i = reply('first a i', first_a)
+    first_b = reply('first b', first)
+    second = reply('second')
+
+    response = client.get(f'/api/v1/comments/{first}/thread', headers=auth_headers)
+    assert response.status_code == 200
+    comments = response.json['comments']
+    assert [c['id'] for c in comments] == [first, first_a, first_a_i, first_b]
+    assert [c['depth'] for c in comments] == [0, 1, 2, 1]
+    assert comments[2]['parent_id'] == first_a
+
+    # Paged by path, limited by depth
+    response = client.get(f'/api/v1/comments/{first}/thread?per_page=2&depth=1', headers=auth_headers)
+    assert [c['id'] for c in response.json['comments']] == [first, first_a]
+    cursor = response.json['next_cursor']
+    response = client.get(f'/api/v1/comments/{first}/thread?per_page=2&depth=1&cursor={cursor}',
+                          headers=auth_headers)
+    assert [c['id'] for c in response.json['comments']] == [first_b]
+    assert response.json['next_cursor'] is None
+
+    response = client.get(f'/api/v1/blog_posts/{post_id}/threads?per_page=1', headers=auth_headers)
+    assert response.status_code == 200
+    [thread] = response.json['threads']
+    assert thread['id'] == first
+    assert [c['id'] for c in thread['replies']] == [first_a, first_a_i, first_b]
+    response = client.get(f"/api/v1/blog_posts/{post_id}/threads?per_page=1&depth=0"
+                          f"&cursor={response.json['next_cursor']}", headers=auth_headers)
+    assert [(t['id'], t['replies']) for t in response.json['threads']] == [(second, [])]
+
+    # Replies must stay on the parent's post and within COMMENT_MAX_DEPTH
+    other = BlogPost(title='Other', content='Body', author_id=user.id)
+    db.session.add(other)
+    db.session.commit()
+    response = client.post('/api/v1/comments', json={
+        'blog_post_id': str(other.id), 'user_id': user_id, 'comment': 'x', 'parent_id': first
+    }, headers=auth_headers)
+    assert response.status_code == 400
+    client.application.config['COMMENT_MAX_DEPTH'] = 2
+    try:
+        response = client.post('/api/v1/comments', json={
+            'blog_post_id': post_id, 'user_id': user_id, 'comment': 'x', 'parent_id': first_a_i
+        }, headers=auth_headers)
+        assert response.status_code == 400
+    finally:
+        client.application.config['COMMENT_MAX_DEPTH'] = 8
+
+    # Deleting a comment deletes its replies
+    response = client.delete(f'/api/v1/comments/{first}', headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json['deleted'] == 4
+    assert db.session.get(BlogPost, post.id).comment_count == 1
+    assert client.get(f'/api/v1/comments/{first_a_i}', headers=auth_headers).status_code == 404
+
+def test_comment_authorization_uses_token_claims(client):
+    from flask_jwt_extended import decode_token
+    from sqlalchemy import event
+    owner = User(username='owner', email='owner@example.com', firstname='O', lastname='Wner', role='author')
+    other = User(username='other', email='other@example.com', firstname='O', lastname='Ther', role='author')
+    for user in (owner, other):
+        user.set_password('password')
+    db.session.add_all([owner, other])
+    db.session.commit()
+    post = BlogPost(title='Owned', content='Body', author_id=other.id)
+    db.session.add(post)
+    db.session.commit()
+    comment = Comment(blog_post_id=post.id, user_id=owner.id, comment='Mine')
+    db.session.add(comment)
+    db.session.commit()
+    comment_id, owner_id = str(comment.id), owner.id
+
+    tokens = {}
+    for username in ('owner', 'other'):
+        response = client.post('/api/v1/login', json={'identifier': username, 'password': 'password'})
+        tokens[username] = {'Authorization': f"Bearer {response.json['access_token']}"}
+    claims = decode_token(tokens['owner']['Authorization'].split()[1])
+    assert claims['sub'] == 'owner'
+    assert claims['user_id'] == str(owner_id) and claims['role'] == 'author'
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.put(f'/api/v1/comments/{comment_id}', json={'comment': 'Edited'},
+                              headers=tokens['owner'])
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.status_code == 200
+    assert not any('FROM users' in statement for statement in statements)
+
+    # Neither the comment's author nor an admin, but the post's author
+    response = client.delete(f'/api/v1/comments/{comment_id}', headers=tokens['other'])
+    assert response.status_code == 200
+
 def test_create_comment(test_client, auth_header, new_blog_post):
     response = test_client.post(
         '/api/v1/comments',
@@ -0,0 +1,51 @@
+import os
+import time
+import pytest
+
+gevent = pytest.importorskip('gevent')
+psycopg2 = pytest.importorskip('psycopg2')
+
+from psycopg2 import extensions
+from sqlalchemy import create_engine, text
+from api.utils.greenio import gevent_wait_callback, init_green_db
+
+DATABASE_URL = os.getenv('TEST_DATABASE_URL', '')
+pytestmark = pytest.mark.skipif(not DATABASE_URL.startswith('postgresql'),
+                                reason='needs a Postgres TEST_DATABASE_URL')
+
+
+@pytest.fixture
+def green_engine():
+    previous = extensions.get_wait_callback()
+    engine = create_engine(DATABASE_URL, pool_size=10)
+    yield engine
+    engine.dispose()
+    extensions.set_wait_callback(previous)
+
+
+def sleep_queries(engine, count, seconds):
+    def query():
+        with engine.connect() as connection:
+            connection.execute(text('SELECT pg_sleep(:seconds)'), {'seconds': seconds})
+
+    started = time.perf_counter()
+    gevent.joinall([gevent.spawn(query) for _ in range(count)], raise_error=True)
+    return time.perf_counter() - started
+
+
+def test_slow_queries_overlap_with_wait_callback(green_engine):
+    from api.app import app
+    app.config['DB_GREEN_WAIT'] = True
+    try:
+        init_green_db(app)
+    finally:
+        app.config['DB_GREEN_WAIT'] = False
+    assert extensions.get_wait_callback() is gevent_wait_callback
+
+    # Five 0.3 s queries take ~0.3 s together, not 1.5 s
+    assert sleep_queries(green_engine, 5, 0.3) < 0.9
+
+
+def test_slow_queries_serialize_without_wait_callback(green_engine):
+    extensions.set_wait_callback(None)
+    assert sleep_queries(green_engine, 3, 0.2) >= 0.6
@@ -0,0 +1,38 @@
+import time
+from datetime import datetime, timezone
+from uuid import uuid4
+from flask_jwt_extended import create_access_token
+from api.models.blogmodels import db, User
+from api.utils.ids import uuid7, uuid7_time
+
+
+def test_uuid7_layout_and_order():
+    before = datetime.now(timezone.utc)
+    ids = [uuid7() for _ in range(10000)]
+
+    assert all(value.version == 7 and value.variant == 'specified in RFC 4122' for value in ids)
+    # Strictly increasing, also within a millisecond, and unique
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+    assert str(ids[0]) < str(ids[-1])
+    assert abs((uuid7_time(ids[0]) - before).total_seconds()) < 1
+    assert uuid7_time(uuid4()) is None
+
+
+def test_uuid7_orders_across_milliseconds():
+    first = uuid7()
+    time.sleep(0.002)
+    assert uuid7() > first
+
+
+def test_new_rows_get_uuid7_and_v4_ids_stay_valid(client):
+    new = User(username='seven', email='seven@example.com', password='x', firstname='S', lastname='Even')
+    old = User(id=uuid4(), username='four', email='four@example.com', password='x', firstname='F', lastname='Our')
+    db.session.add_all([new, old])
+    db.session.commit()
+    assert new.id.version == 7
+    headers = {'Authorization': f'Bearer {create_access_token(identity=new)}'}
+
+    for user in (new, old):
+        response = client.put(f'/api/v1/users/{user.id}', json={'is_active': True}, headers=headers)
+        assert response.status_code == 200
+        assert response.json['id'] == str(user.id)
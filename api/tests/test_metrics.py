@@ -0,0 +1,94 @@
+import pytest
+from flask import Flask
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import text
+from api.utils.dbpool import TimedQueuePool
+from api.utils.metrics import Metrics
+
+
+@pytest.fixture
+def prometheus_client():
+    return pytest.importorskip('prometheus_client')
+
+
+@pytest.fixture
+def metrics(prometheus_client):
+    metrics = Metrics(registry=prometheus_client.CollectorRegistry())
+    yield metrics
+    metrics.detach()
+
+
+def test_metrics_disabled_by_default(client):
+    assert client.get('/metrics').status_code == 404
+
+
+def test_request_metrics(metrics):
+    app = Flask(__name__)
+    app.config['METRICS_ENABLED'] = True
+    metrics.init_app(app)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    @app.route('/fail')
+    def fail():
+        raise KeyError('boom')
+
+    @app.route('/caught')
+    def caught():
+        return {'error': 'database unavailable'}, 500
+
+    with app.test_client() as client:
+        client.get('/ping')
+        client.get('/ping')
+        client.get('/fail')
+        client.get('/caught')
+        client.get('/nowhere')
+
+    registry = metrics.registry
+    assert registry.get_sample_value('http_requests_total',
+                                     {'endpoint': 'ping', 'method': 'GET', 'status': '200'}) == 2
+    assert registry.get_sample_value('http_requests_total',
+                                     {'endpoint': '<unmatched>', 'method': 'GET', 'status': '404'}) == 1
+    assert registry.get_sample_value('http_request_duration_seconds_count',
+                                     {'endpoint': 'ping', 'method': 'GET'}) == 2
+    assert registry.get_sample_value('http_response_size_bytes_sum', {'endpoint': 'ping'}) == 8
+    assert registry.get_sample_value('http_request_exceptions_total',
+                                     {'endpoint': 'fail', 'exception': 'KeyError'}) == 1
+    assert registry.get_sample_value('http_server_errors_total',
+                                     {'endpoint': 'fail', 'status': '500'}) == 1
+    assert registry.get_sample_value('http_server_errors_total',
+                                     {'endpoint': 'caught', 'status': '500'}) == 1
+
+    body, content_type = metrics.exposition()
+    assert content_type.startswith('text/plain')
+    assert b'http_requests_total{endpoint="ping",method="GET",status="200"} 2.0' in body
+
+    # Collectors are registered once, however many apps are instrumented
+    other = Flask(__name__)
+    other.config['METRICS_ENABLED'] = True
+    metrics.init_app(other)
+
+
+def test_pool_metrics(metrics, tmp_path):
+    app = Flask(__name__)
+    app.config.update(METRICS_ENABLED=True, SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path}/pool.db',
+                      SQLALCHEMY_ENGINE_OPTIONS={'poolclass': TimedQueuePool})
+    db = SQLAlchemy(app)
+    metrics.init_app(app)
+
+    with app.app_context():
+        db.session.execute(text('SELECT 1'))
+        assert metrics.registry.get_sample_value('db_pool_connections_in_use') == 1
+        db.session.remove()
+        assert metrics.registry.get_sample_value('db_pool_connections_in_use') == 0
+        assert metrics.registry.get_sample_value('db_pool_connections_opened_total') == 1
+        assert metrics.registry.get_sample_value('db_pool_checkout_wait_seconds_count') == 1
+
+        # The hooks belong to this app's engine, and go away with detach()
+        metrics.detach()
+        assert db.engine.pool.on_checkout is None
+        db.session.execute(text('SELECT 1'))
+        db.session.remove()
+        assert metrics.registry.get_sample_value('db_pool_checkout_wait_seconds_count') == 1
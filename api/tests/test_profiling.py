@@ -0,0 +1,58 @@
+import logging
+import re
+import pytest
+from flask import Response
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from api.app import app
+from api.models.blogmodels import db, User
+from api.utils.profiling import sql_profiler, normalize_sql
+
+
+@pytest.fixture
+def profiling():
+    sql_profiler.enable()
+    yield sql_profiler
+    sql_profiler.disable()
+
+
+def auth_headers():
+    user = User(username='profiled', email='profiled@example.com', password='x', firstname='P', lastname='Rofiled')
+    db.session.add(user)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+
+
+def test_server_timing_reports_queries(client, profiling):
+    response = client.get('/api/v1/users?page=1', headers=auth_headers())
+    assert response.status_code == 200
+
+    timing = response.headers.getlist('Server-Timing')
+    db_timing = re.fullmatch(r'db;dur=[\d.]+;desc="(\d+) queries"', timing[0])
+    # COUNT(*) and the page itself
+    assert db_timing and int(db_timing.group(1)) == 2
+    assert re.fullmatch(r'app;dur=[\d.]+', timing[1])
+
+
+def test_no_server_timing_when_disabled(client):
+    response = client.get('/api/v1/users', headers=auth_headers())
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
+
+
+def test_repeated_statement_is_logged(client, profiling, monkeypatch, caplog):
+    monkeypatch.setattr(profiling, 'repeat_threshold', 2)
+    with app.test_request_context('/api/v1/users'), caplog.at_level(logging.WARNING, 'api.app.profile'):
+        profiling._start()
+        for user_id in range(3):
+            db.session.execute(text('SELECT username FROM users WHERE id = :id'), {'id': user_id})
+        profiling._finish(Response())
+
+    assert 'statement run 3 times: SELECT username FROM users WHERE id = ?' in caplog.text
+
+
+def test_normalize_sql():
+    assert normalize_sql("SELECT *\n  FROM posts WHERE id IN (?, ?, ?) AND title = 'it''s' LIMIT 10") == \
+        'SELECT * FROM posts WHERE id IN (?) AND title = ? LIMIT ?'
+    assert normalize_sql('SELECT id::text FROM users WHERE id = %(id_1)s') == \
+        'SELECT id::text FROM users WHERE id = ?'
@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+import pytest
+from sqlalchemy import event
+from flask_jwt_extended import create_access_token
+from api.models.blogmodels import db, User, BlogPost, Comment
+
+
+@pytest.fixture
+def auth_headers(client):
+    token = create_access_token(identity='testuser')
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def post(client):
+    author = User(username='planner', email='planner@example.com', password='password',
+                  firstname='Query', lastname='Planner')
+    db.session.add(author)
+    db.session.commit()
+    post = BlogPost(title='Indexed', content='Body', author_id=author.id)
+    db.session.add(post)
+    db.session.commit()
+    db.session.add_all([Comment(blog_post_id=post.id, user_id=author.id, comment=f'Comment {i}')
+                        for i in range(3)])
+    db.session.commit()
+    return post
+
+
+@contextmanager
+def captured_statements():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+
+
+def explain(statement, parameters):
+    connection = db.session.connection()
+    if db.engine.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        return '\n'.join(row[-1] for row in rows)
+
+    # Tiny test tables make a sequential scan cheapest; ask whether an index is usable at all
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+    return '\n'.join(row[0] for row in rows)
+
+
+def plan_for(client, url, headers, table):
+    with captured_statements() as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
+
+    selects = [(sql, params) for sql, params in statements
+               if sql.lstrip().startswith('SELECT') and f'FROM {table}' in sql and 'ORDER BY' in sql]
+    assert selects, f'no ordered query against {table} for {url}'
+    return explain(*selects[-1])
+
+
+def test_blog_posts_cursor_uses_index(client, auth_headers, post):
+    plan = plan_for(client, '/api/v1/blog_posts?cursor=', auth_headers, 'blog_posts')
+    assert 'ix_blog_posts_created_at_id' in plan
+
+
+def test_users_cursor_uses_index(client, auth_headers, post):
+    plan = plan_for(client, '/api/v1/users?cursor=', auth_headers, 'users')
+    assert 'ix_users_created_at_id' in plan
+
+
+def test_comments_cursor_uses_index(client, auth_headers, post):
+    plan = plan_for(client, f'/api/v1/blog_posts/{post.id}/comments?cursor=', auth_headers, 'comments')
+    assert 'ix_comments_blog_post_id_created_at_id' in plan
@@ -0,0 +1,86 @@
+import uuid
+from sqlalchemy import create_engine, insert
+from flask_jwt_extended import create_access_token
+from api.models.blogmodels import db, User, BlogPost
+from api.utils.replicas import replica_router
+
+
+def titles(client, headers):
+    response = client.get('/api/v1/blog_posts?per_page=50', headers=headers)
+    assert response.status_code == 200
+    return sorted(post['title'] for post in response.json['posts'])
+
+
+def test_reads_go_to_replica_until_user_writes(client, tmp_path, monkeypatch):
+    # A second SQLite file stands in for a replica that hasn't caught up
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(replica)
+    author_id = uuid.uuid4()
+    with replica.begin() as connection:
+        connection.execute(insert(User).values(id=author_id, username='replicated', email='r@example.com',
+                                               password='x', firstname='R', lastname='Eplica'))
+        connection.execute(insert(BlogPost).values(title='On replica', content='Body', author_id=author_id))
+    monkeypatch.setattr(replica_router, 'engines', [replica])
+
+    writer = User(username='writer', email='writer@example.com', password='x', firstname='W', lastname='Riter')
+    reader = User(username='reader', email='reader@example.com', password='x', firstname='R', lastname='Eader')
+    db.session.add_all([writer, reader])
+    db.session.commit()
+    db.session.add(BlogPost(title='On primary', content='Body', author_id=writer.id))
+    db.session.commit()
+    writer_headers = {'Authorization': f'Bearer {create_access_token(identity=writer)}'}
+    reader_headers = {'Authorization': f'Bearer {create_access_token(identity=reader)}'}
+
+    assert titles(client, writer_headers) == ['On replica']
+
+    response = client.post('/api/v1/blog_posts', json={
+        'title': 'Just written', 'content': 'Body', 'author_id': str(writer.id)
+    }, headers=writer_headers)
+    assert response.status_code == 201
+
+    # The writer now reads their own write from the primary; others still use the replica
+    assert titles(client, writer_headers) == ['Just written', 'On primary']
+    assert titles(client, reader_headers) == ['On replica']
+    replica.dispose()
+
+
+def test_replica_reads_do_not_refill_cache_for_writer(client, tmp_path, monkeypatch):
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(replica)
+    writer = User(username='editor', email='old@example.com', password='x', firstname='E', lastname='Ditor')
+    reader = User(username='viewer', email='viewer@example.com', password='x', firstname='V', lastname='Iewer')
+    db.session.add_all([writer, reader])
+    db.session.commit()
+    # The replica still has the writer's row as it was before the update below
+    with replica.begin() as connection:
+        connection.execute(insert(User).values(id=writer.id, username='editor', email='old@example.com',
+                                               password='x', firstname='E', lastname='Ditor'))
+    monkeypatch.setattr(replica_router, 'engines', [replica])
+    writer_headers = {'Authorization': f'Bearer {create_access_token(identity=writer)}'}
+    reader_headers = {'Authorization': f'Bearer {create_access_token(identity=reader)}'}
+
+    response = client.put(f'/api/v1/users/{writer.id}', json={'email': 'new@example.com'}, headers=writer_headers)
+    assert response.status_code == 200
+
+    # The reader sees the lagging replica, without caching what it read there
+    # (tests share one session, so forget the rows loaded so far first)
+    db.session.expunge_all()
+    response = client.get(f'/api/v1/users/{writer.id}', headers=reader_headers)
+    assert response.json['email'] == 'old@example.com'
+    db.session.expunge_all()
+    response = client.get(f'/api/v1/users/{writer.id}', headers=writer_headers)
+    assert response.json['email'] == 'new@example.com'
+    replica.dispose()
+
+
+def test_pins_survive_a_null_model_cache(client):
+    from api.utils.cache import model_cache
+    from api.utils.replicas import make_pin_store
+    pins = make_pin_store({'CACHE_BACKEND': 'null'})
+    pins.set('replica-pin:someone', True, 5)
+    assert pins.get('replica-pin:someone')
+    # Clearing the model cache leaves the pins alone
+    assert replica_router.pins is not model_cache.backend
+    replica_router.pins.set('replica-pin:someone', True, 5)
+    model_cache.backend.clear()
+    assert replica_router.pins.get('replica-pin:someone')
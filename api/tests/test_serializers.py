@@ -0,0 +1,34 @@
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from api.models.blogmodels import BlogPost
+from api.schemas.blogschema import BlogPostSchema
+from api.schemas.serializers import post_serializer
+from api.utils.fastjson import OrjsonProvider
+
+
+def make_post():
+    return BlogPost(id=uuid.uuid4(), title='Title', content='Some content', author_id=uuid.uuid4(),
+                    created_at=datetime(2024, 8, 1, 12, 30, 5), updated_at=None, comment_count=3,
+                    last_comment_at=datetime(2024, 8, 2, 9, 0, 0))
+
+
+def test_post_serializer_matches_schema():
+    post = make_post()
+    assert post_serializer.dump(post) == BlogPostSchema().dump(post)
+    assert post_serializer.dump_many([post], ('title', 'id')) == [{'id': str(post.id), 'title': 'Title'}]
+    # Compiled once per selection, regardless of order
+    assert post_serializer.function(('id', 'title')) is post_serializer.function(('title', 'id'))
+
+
+def test_orjson_provider_matches_default():
+    app = Flask(__name__)
+    payload = {'id': uuid.uuid4(), 'created_at': datetime(2024, 8, 1, 12, 30, 5), 'price': Decimal('1.50'),
+               'items': [1, 'two', None], 'nested': {'b': 1, 'a': True}}
+
+    fast = OrjsonProvider(app).dumps(payload)
+    assert json.loads(fast) == json.loads(DefaultJSONProvider(app).dumps(payload))
+    assert list(json.loads(fast)) == sorted(payload)
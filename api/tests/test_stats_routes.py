@@ -0,0 +1,45 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from api.models.blogmodels import db, User
+from api.utils.dbpool import engine_options, TimedQueuePool
+
+
+def token_for(role):
+    user = User(username=f'{role}-stats', email=f'{role}-stats@example.com', password='password',
+                firstname='S', lastname='Tats', role=role)
+    db.session.add(user)
+    db.session.commit()
+    return {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+
+
+def test_pool_stats(client):
+    if not isinstance(db.engine.pool, TimedQueuePool):
+        # e.g. in-memory SQLite, which Flask-SQLAlchemy puts on a StaticPool
+        pytest.skip(f'{type(db.engine.pool).__name__} keeps no pool stats')
+
+    response = client.get('/api/v1/stats/pool', headers=token_for('admin'))
+    assert response.status_code == 200
+    stats = response.json['default']
+    assert stats['pool'] == 'TimedQueuePool'
+    assert stats['size'] == client.application.config['DB_POOL_SIZE']
+    assert stats['checkouts'] >= 1
+    assert stats['checked_out'] >= 1  # this request's own connection
+    assert stats['max_wait_ms'] >= stats['avg_wait_ms'] >= 0
+
+
+def test_pool_stats_admin_only(client):
+    response = client.get('/api/v1/stats/pool', headers=token_for('author'))
+    assert response.status_code == 403
+
+
+def test_engine_options():
+    config = {'DB_POOL_SIZE': 7, 'DB_MAX_OVERFLOW': 3, 'DB_POOL_TIMEOUT': 5, 'DB_POOL_RECYCLE': 60,
+              'DB_POOL_PRE_PING': True, 'DB_STATEMENT_TIMEOUT_MS': 2500}
+
+    options = engine_options({**config, 'SQLALCHEMY_DATABASE_URI': 'postgresql://db/blog'})
+    assert options['poolclass'] is TimedQueuePool
+    assert (options['pool_size'], options['max_overflow'], options['pool_pre_ping']) == (7, 3, True)
+    assert options['connect_args'] == {'options': '-c statement_timeout=2500'}
+
+    assert 'connect_args' not in engine_options({**config, 'SQLALCHEMY_DATABASE_URI': 'sqlite:////tmp/blog.db'})
+    assert engine_options({**config, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}) == {}
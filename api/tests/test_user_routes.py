@@ -3,7 +3,7 @@ import json
 import pytest
 from uuid import uuid4
 from sqlalchemy.exc import SQLAlchemyError
-from api.models.blogmodels import User, db
+from api.models.blogmodels import User, BlogPost, db
 from flask_jwt_extended import create_access_token
 
 @pytest.fixture
@@ -78,6 +78,59 @@ def test_create_user_duplicate_user(client):
     assert 'error' in data
     assert data['error'] == 'User with that username or email already exists'
 
+def test_create_user_conflicts_ignore_case(client):
+    from sqlalchemy import event
+    from api.models.blogmodels import db
+    user_data = {'username': 'CaseUser', 'email': 'Case@Example.com', 'password': 'password123',
+                 'firstname': 'Case', 'lastname': 'User'}
+    response = client.post('/api/v1/users', json=user_data)
+    assert response.status_code == 201
+
+    statements = []
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        response = client.post('/api/v1/users', json={**user_data, 'username': 'caseuser', 'email': 'new@example.com'})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    assert response.status_code == 409
+    assert response.json['field'] == 'username'
+    # No lookup before the INSERT
+    assert [statement.split()[0] for statement in statements] == ['INSERT']
+
+    response = client.post('/api/v1/users', json={**user_data, 'username': 'other', 'email': 'CASE@example.COM'})
+    assert response.status_code == 409
+    assert response.json['field'] == 'email'
+
+    response = client.post('/api/v1/login', json={'identifier': 'case@example.com', 'password': 'password123'})
+    assert response.status_code == 200
+
+def test_create_users_batch(client, auth_header):
+    existing = User(username='taken', email='taken@example.com', password='password',
+                    firstname='Taken', lastname='User')
+    db.session.add(existing)
+    db.session.commit()
+
+    def user(name, email=None):
+        return {'username': name, 'email': email or f'{name}@example.com', 'password': 'password123',
+                'firstname': 'Batch', 'lastname': 'User'}
+
+    response = client.post('/api/v1/users:batch', json={'users': [
+        user('batch1'),
+        user('taken'),
+        user('batch1', 'other@example.com'),
+        user('bademail', 'not-an-email'),
+        user('batch2'),
+        {**user('numeric'), 'email': 12345},
+        {**user('listed'), 'username': ['listed']},
+    ]}, headers=auth_header)
+    assert response.status_code == 207
+    data = response.get_json()
+    assert [result['status'] for result in data['results']] == [201, 409, 409, 400, 201, 400, 400]
+    assert User.query.filter(User.username.in_(['batch1', 'batch2'])).count() == 2
+
 # Get users route tests
 def test_get_users_success(client, setup_database, auth_header):
     response = client.get('/api/v1/users', headers=auth_header, query_string={'page': 1, 'per_page': 10})
@@ -117,6 +170,112 @@ def test_get_users_large_page_number(client, setup_database, auth_header):
     assert 'users' in data
     assert len(data['users']) == 0, f"Expected 0 users, got {len(data['users'])}"
 
+def test_get_users_cursor_pagination(client, auth_header):
+    db.session.add_all([
+        User(username=f'cursor{i}', email=f'cursor{i}@example.com', password='password',
+             firstname=f'First{i}', lastname=f'Last{i}', role='user')
+        for i in range(25)
+    ])
+    db.session.commit()
+
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get('/api/v1/users', headers=auth_header,
+                              query_string={'cursor': cursor, 'per_page': 10})
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 'total' not in data
+        seen.extend(user['id'] for user in data['users'])
+        cursor = data['next_cursor']
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+def test_get_users_invalid_cursor(client, auth_header):
+    response = client.get('/api/v1/users', headers=auth_header, query_string={'cursor': 'not-a-cursor'})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+def test_get_users_per_page_capped(client, auth_header):
+    db.session.add_all([
+        User(username=f'capped{i}', email=f'capped{i}@example.com', password='password',
+             firstname=f'First{i}', lastname=f'Last{i}', role='user')
+        for i in range(8)
+    ])
+    db.session.commit()
+
+    client.application.config['MAX_PER_PAGE'] = 5
+    try:
+        response = client.get('/api/v1/users', headers=auth_header, query_string={'page': 1, 'per_page': 1000})
+    finally:
+        client.application.config['MAX_PER_PAGE'] = 100
+    assert response.status_code == 200
+    assert len(response.get_json()['users']) == 5
+
+def test_get_user_etag(client, auth_header):
+    user = User(username='etaguser', email='etag@example.com', password='password',
+                firstname='E', lastname='Tag')
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.get(f'/api/v1/users/{user.id}', headers=auth_header)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get(f'/api/v1/users/{user.id}', headers={**auth_header, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+def test_get_users_include_posts(client, auth_header):
+    users = [User(username=f'writer{i}', email=f'writer{i}@example.com', password='password',
+                  firstname='W', lastname=str(i)) for i in range(2)]
+    db.session.add_all(users)
+    db.session.commit()
+    db.session.add_all([BlogPost(title=f'{user.username} post {i}', content='Body', author_id=user.id)
+                        for user in users for i in range(7)])
+    db.session.commit()
+
+    response = client.get('/api/v1/users?include=posts', headers=auth_header)
+    assert response.status_code == 200
+    for user in response.json['users']:
+        assert len(user['posts']) == client.application.config['INCLUDE_MAX_POSTS']
+        assert all(post['title'].startswith(user['username']) for post in user['posts'])
+
+    response = client.get(f'/api/v1/users/{users[0].id}?include=posts', headers=auth_header)
+    assert response.status_code == 200
+    assert response.headers['ETag'].startswith('W/')
+    assert len(response.json['posts']) == client.application.config['INCLUDE_MAX_POSTS']
+
+    response = client.get('/api/v1/users?include=comments', headers=auth_header)
+    assert response.status_code == 400
+
+def test_get_users_by_ids(client, auth_header):
+    users = [User(username=f'listed{i}', email=f'listed{i}@example.com', password='password',
+                  firstname='L', lastname=str(i)) for i in range(3)]
+    db.session.add_all(users)
+    db.session.commit()
+    ids = [str(users[1].id), str(users[0].id), str(users[1].id)]
+
+    response = client.get(f'/api/v1/users?ids={ids[0]}&ids={ids[1]},{ids[2]}', headers=auth_header)
+    assert response.status_code == 200
+    assert [user['username'] for user in response.json['users']] == ['listed1', 'listed0']
+    assert response.json['missing'] == []
+    assert 'password' not in response.json['users'][0]
+
+    response = client.post('/api/v1/users:lookup', json={'ids': 'nope'}, headers=auth_header)
+    assert response.status_code == 400
+
+def test_export_users_command(client, tmp_path):
+    db.session.add(User(username='exported', email='exported@example.com', password='secret-hash',
+                        firstname='Ex', lastname='Ported'))
+    db.session.commit()
+
+    output = tmp_path / 'users.ndjson'
+    result = client.application.test_cli_runner().invoke(args=['export', 'users', '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    rows = [json.loads(line) for line in output.read_text().splitlines()]
+    assert [row['username'] for row in rows] == ['exported']
+    assert 'password' not in rows[0]
+
 # test longin routes
 def test_login_success(test_client):
     response = test_client.post('/api/v1/login', json={
@@ -139,6 +298,26 @@ def test_login_failure(test_client):
     assert response.status_code == 401
     assert data['message'] == 'Invalid username or password'
 
+def test_login_rehashes_outdated_password(client):
+    from werkzeug.security import generate_password_hash
+    user = User(username='legacy', email='legacy@example.com', firstname='Old', lastname='Hash',
+                password=generate_password_hash('legacy-password', 'pbkdf2:sha256:1000'))
+    db.session.add(user)
+    db.session.commit()
+
+    response = client.post('/api/v1/login', json={'identifier': 'legacy', 'password': 'legacy-password'})
+    assert response.status_code == 200
+
+    db.session.refresh(user)
+    assert user.password.startswith('scrypt:')
+    assert user.check_password('legacy-password')
+
+    # Already current: left untouched
+    current = user.password
+    client.post('/api/v1/login', json={'identifier': 'legacy', 'password': 'legacy-password'})
+    db.session.refresh(user)
+    assert user.password == current
+
 def test_login_missing_fields(test_client):
     response = test_client.post('/api/v1/login', json={})
 
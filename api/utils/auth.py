@@ -0,0 +1,92 @@
+from functools import wraps
+from flask import current_app, g
+from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import or_, select
+from werkzeug.local import LocalProxy
+from api.models.blogmodels import db, User
+from api.utils.cache import MemoryCache, to_uuid
+
+# Resolved users for tokens issued before the claims below existed
+_legacy_users = MemoryCache(max_entries=10000)
+
+
+def init_jwt(jwt):
+    """Embed the user id and role in every access token issued for a User."""
+
+    @jwt.user_identity_loader
+    def user_identity(identity):
+        # The subject stays the username, as in tokens issued before
+        return identity.username if isinstance(identity, User) else identity
+
+    @jwt.additional_claims_loader
+    def user_claims(identity):
+        if isinstance(identity, User):
+            return {'user_id': str(identity.id), 'role': identity.role}
+        return {}
+
+
+def _lookup(identity):
+    """(id, username, role) for a subject that is a username or a user id."""
+    cached = _legacy_users.get(identity)
+    if cached is not None:
+        return cached
+
+    user_id = to_uuid(identity)
+    condition = User.id == user_id if user_id else User.username == identity
+    row = db.session.execute(select(User.id, User.username, User.role).where(condition)).first()
+    user = tuple(row) if row else (None, None, None)
+    _legacy_users.set(identity, user, current_app.config.get('AUTH_USER_CACHE_TTL', 10))
+    return user
+
+
+class CurrentUser:
+    """The authenticated user, as described by the access token.
+
+    Tokens from /login carry the user id and role as claims, so reading them
+    costs no query. Older tokens only name the user; those are resolved on
+    first access and cached for AUTH_USER_CACHE_TTL seconds.
+    """
+
+    def __init__(self, claims):
+        self.identity = claims['sub']
+        if 'user_id' in claims:
+            self._user = (to_uuid(claims['user_id']), self.identity, claims.get('role'))
+        else:
+            self._user = None
+
+    def _resolved(self):
+        if self._user is None:
+            self._user = _lookup(self.identity)
+        return self._user
+
+    @property
+    def id(self):
+        return self._resolved()[0]
+
+    @property
+    def username(self):
+        return self._resolved()[1]
+
+    @property
+    def role(self):
+        return self._resolved()[2]
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+def auth_required(**jwt_options):
+    """@jwt_required() that also makes the token's user available as `current_user`."""
+    def decorator(function):
+        @jwt_required(**jwt_options)
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            claims = get_jwt()
+            g.current_user = CurrentUser(claims) if claims else None
+            return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+current_user = LocalProxy(lambda: g.get('current_user'))
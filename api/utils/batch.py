@@ -0,0 +1,57 @@
+from flask import current_app, jsonify
+from sqlalchemy import insert
+from api.models.blogmodels import db
+from api.utils.cache import to_uuid
+
+
+def batch_items(data, key):
+    """Pull the list of objects to create out of a batch request body.
+
+    Returns (items, None) or (None, (response, status)) when the body is unusable.
+    """
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'error': f'Expected a non-empty "{key}" list'}), 400)
+
+    limit = current_app.config.get('BATCH_MAX_ITEMS', 1000)
+    if len(items) > limit:
+        return None, (jsonify({'error': f'At most {limit} items per batch'}), 400)
+    return items, None
+
+
+def existing_ids(model, ids):
+    """Which of `ids` exist, resolved with a single IN (...) query."""
+    ids = {to_uuid(value) for value in ids} - {None}
+    if not ids:
+        return set()
+    return set(db.session.scalars(db.select(model.id).where(model.id.in_(ids))))
+
+
+def insert_rows(model, rows):
+    """Insert all rows with multi-row INSERT ... RETURNING, in input order."""
+    if not rows:
+        return []
+    statement = insert(model).returning(model.id, model.created_at, sort_by_parameter_order=True)
+    return db.session.execute(statement, rows).all()
+
+
+def failure(index, status, error):
+    return {'index': index, 'status': status, 'error': error}
+
+
+def invalid_item(index, item, required, optional=()):
+    """400 result for an item that lacks a required field or has a non-string one, else None."""
+    if not isinstance(item, dict) or not all(item.get(field) for field in required):
+        return failure(index, 400, 'Missing required fields')
+    if not all(isinstance(item[field], str) for field in (*required, *optional) if field in item):
+        return failure(index, 400, 'Fields must be strings')
+    return None
+
+
+def batch_response(results):
+    created = sum(1 for result in results if result['status'] == 201)
+    return jsonify({
+        'results': results,
+        'created': created,
+        'failed': len(results) - created
+    }), 201 if created == len(results) else 207
@@ -0,0 +1,252 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from uuid import UUID, uuid4
+from flask import abort
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import make_transient_to_detached
+from api.models.blogmodels import db
+from api.utils.replicas import pinned_to_primary, routed_to_replica
+
+
+class CacheBackend:
+    """The small interface ModelCache needs from a key/value store."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def delete(self, *keys):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class NullCache(CacheBackend):
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def delete(self, *keys):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Per-process LRU cache with a TTL on every entry."""
+
+    def __init__(self, max_entries=10000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker process; needs the optional `redis` package."""
+
+    def __init__(self, url, prefix='blog:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=max(int(ttl), 1))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=self.prefix + '*'))
+        if keys:
+            self.client.delete(*keys)
+
+
+def make_backend(config):
+    backend = config.get('CACHE_BACKEND', 'memory')
+    if backend == 'memory':
+        return MemoryCache(config.get('CACHE_MAX_ENTRIES', 10000))
+    if backend == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'])
+    if backend in ('null', 'none', ''):
+        return NullCache()
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+
+# Never copied into the cache; loaded from the database if a cached row needs it
+UNCACHED_COLUMNS = frozenset({'password'})
+
+
+def to_uuid(value):
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        return None
+
+
+class ModelCache:
+    """Read-through cache for primary-key lookups of models.
+
+    Rows are stored as plain column dicts and re-attached to the current
+    session with merge(load=False), so a hit costs no database round trip.
+    Entries for rows updated or deleted through the session are dropped after
+    the transaction commits; writes that bypass the ORM (bulk UPDATE
+    statements) must call invalidate_on_commit() themselves.
+
+    Invalidation only reaches the backend it runs against: with the default
+    in-process backend, other workers keep serving their copy of a changed
+    row for up to CACHE_TTL seconds. Use the redis backend when that matters.
+
+    Every invalidation also stamps the key with a new generation, and a miss
+    only fills the cache if the generation it saw before reading the
+    database is still current, so a read that raced a write can't put the
+    old row back for a whole TTL.
+    """
+
+    def __init__(self):
+        self.backend = NullCache()
+        self.ttl = 30
+
+    def init_app(self, app):
+        self.backend = make_backend(app.config)
+        self.ttl = app.config.get('CACHE_TTL', 30)
+        app.extensions['model_cache'] = self
+
+    @staticmethod
+    def key(model, ident):
+        return f'{model.__tablename__}:{ident}'
+
+    @staticmethod
+    def generation_key(key):
+        return f'generation:{key}'
+
+    def get(self, model, ident):
+        ident = to_uuid(ident)
+        if ident is None:
+            return None
+
+        # Already loaded in this session: no cache or database access needed
+        identity_key = db.session.identity_key(model, ident)
+        if identity_key in db.session.identity_map:
+            return db.session.identity_map[identity_key]
+
+        # A recent writer reads the primary, not rows cached before its write
+        key = self.key(model, ident)
+        data = None if pinned_to_primary() else self.backend.get(key)
+        if data is not None:
+            obj = model(**data)
+            make_transient_to_detached(obj)
+            return db.session.merge(obj, load=False)
+
+        generation = self.backend.get(self.generation_key(key))
+        obj = db.session.get(model, ident)
+        # A lagging replica may return the row as it was before a write that
+        # already invalidated the cache, so only primary reads fill it
+        if (obj is not None and not routed_to_replica()
+                and self.backend.get(self.generation_key(key)) == generation):
+            self.backend.set(key, self._columns(obj), self.ttl)
+        return obj
+
+    def get_or_404(self, model, ident):
+        obj = self.get(model, ident)
+        if obj is None:
+            abort(404)
+        return obj
+
+    @staticmethod
+    def get_for_write_or_404(model, ident):
+        """Load a row that is about to be changed or deleted from the database.
+
+        Bypasses the cache: another worker's in-process copy may belong to a
+        row that is already gone or changed.
+        """
+        ident = to_uuid(ident)
+        obj = db.session.get(model, ident) if ident is not None else None
+        if obj is None:
+            abort(404)
+        return obj
+
+    def invalidate(self, model, *idents):
+        self.evict([self.key(model, ident) for ident in idents])
+
+    def evict(self, keys):
+        """Drop cached rows and start a new generation for their keys."""
+        # Kept for a TTL, longer than any read that started before it runs
+        generation = uuid4().hex
+        for key in keys:
+            self.backend.set(self.generation_key(key), generation, self.ttl)
+        self.backend.delete(*keys)
+
+    def invalidate_on_commit(self, model, *idents):
+        """Evict rows changed by statements that bypass the ORM, once committed."""
+        stale = db.session.info.setdefault('model_cache_stale', set())
+        stale.update(self.key(model, ident) for ident in idents)
+
+    @staticmethod
+    def _columns(obj):
+        return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs
+                if attr.key not in UNCACHED_COLUMNS}
+
+
+model_cache = ModelCache()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_stale_keys(session, flush_context):
+    stale = session.info.setdefault('model_cache_stale', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        identity = inspect(obj).identity
+        if identity:
+            stale.add(ModelCache.key(type(obj), identity[0]))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _drop_stale_keys(session):
+    stale = session.info.pop('model_cache_stale', None)
+    if stale:
+        model_cache.evict(stale)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_stale_keys(session):
+    session.info.pop('model_cache_stale', None)
@@ -0,0 +1,70 @@
+from sqlalchemy import case, func, select, update
+from api.models.blogmodels import db, BlogPost, Comment
+from api.utils.cache import model_cache
+
+
+def _last_comment_at():
+    return select(func.max(Comment.created_at)).where(
+        Comment.blog_post_id == BlogPost.id).scalar_subquery()
+
+
+def comments_added_statement(post_id, count=1):
+    return update(BlogPost).where(BlogPost.id == post_id).values(
+        comment_count=BlogPost.comment_count + count,
+        last_comment_at=func.now(),
+        # Counters aren't edits: stop updated_at's onupdate from firing, which
+        # would re-export the post with `since=`. ETags still change, as they
+        # include the counters (api.utils.etag)
+        updated_at=BlogPost.updated_at
+    ).execution_options(synchronize_session=False)
+
+
+def comments_added(post_id, count=1):
+    """Bump the denormalized counters of a post inside the current transaction."""
+    db.session.execute(comments_added_statement(post_id, count))
+    # The UPDATE bypasses the ORM, so session events can't see the change
+    model_cache.invalidate_on_commit(BlogPost, post_id)
+
+
+def comments_removed(post_id, count=1):
+    """Decrement the counters after comments of a post were deleted (and flushed)."""
+    db.session.execute(
+        update(BlogPost).where(BlogPost.id == post_id).values(
+            comment_count=case((BlogPost.comment_count > count, BlogPost.comment_count - count), else_=0),
+            last_comment_at=_last_comment_at(),
+            updated_at=BlogPost.updated_at
+        ).execution_options(synchronize_session=False)
+    )
+    model_cache.invalidate_on_commit(BlogPost, post_id)
+
+
+def repair_comment_counts(batch_size=1000):
+    """Recompute comment_count and last_comment_at for every post.
+
+    Walks blog_posts in primary-key batches, committing after each one so
+    no long-running transaction holds locks on the whole table. Returns the
+    number of posts processed.
+    """
+    count_comments = select(func.count()).where(Comment.blog_post_id == BlogPost.id).scalar_subquery()
+    processed = 0
+    last_id = None
+    while True:
+        ids = select(BlogPost.id).order_by(BlogPost.id).limit(batch_size)
+        if last_id is not None:
+            ids = ids.where(BlogPost.id > last_id)
+        batch = db.session.scalars(ids).all()
+        if not batch:
+            return processed
+
+        db.session.execute(
+            update(BlogPost).where(BlogPost.id.in_(batch)).values(
+                comment_count=count_comments,
+                last_comment_at=_last_comment_at(),
+                updated_at=BlogPost.updated_at
+            ).execution_options(synchronize_session=False)
+        )
+        model_cache.invalidate_on_commit(BlogPost, *batch)
+        db.session.commit()
+
+        processed += len(batch)
+        last_id = batch[-1]
@@ -0,0 +1,90 @@
+from math import ceil
+from flask import current_app, request
+from sqlalchemy import func, select, text
+from api.models.blogmodels import db
+from api.utils.cache import model_cache
+
+COUNT_MODES = ('exact', 'estimate', 'none')
+
+
+class InvalidCountMode(ValueError):
+    pass
+
+
+def parse_count(listing):
+    """Read the `count` query parameter of a paginated listing.
+
+    Defaults to COUNT_<LISTING> (COUNT_POSTS, COUNT_USERS, COUNT_COMMENTS);
+    raises InvalidCountMode for anything but exact, estimate or none.
+    """
+    mode = request.args.get('count') or current_app.config.get(f'COUNT_{listing.upper()}', 'exact')
+    if mode not in COUNT_MODES:
+        raise InvalidCountMode(mode)
+    return mode
+
+
+def cached_count(key, statement):
+    """COUNT(*) of `statement`, shared through the cache backend for COUNT_CACHE_TTL seconds."""
+    key = f'count:{key}'
+    total = model_cache.backend.get(key)
+    if total is None:
+        total = db.session.scalar(select(func.count()).select_from(statement.subquery()))
+        model_cache.backend.set(key, total, current_app.config.get('COUNT_CACHE_TTL', 60))
+    return total
+
+
+def estimated_count(model):
+    """Approximate row count of a whole table.
+
+    On Postgres, the planner's pg_class.reltuples, kept current by
+    autovacuum's ANALYZE at no cost per request. Elsewhere, or before the
+    table was first analyzed, a cached exact count.
+    """
+    if db.session.get_bind(model.__mapper__).dialect.name == 'postgresql':
+        reltuples = db.session.scalar(text('SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+                                      {'table': model.__tablename__})
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    return cached_count(model.__tablename__, select(model.id))
+
+
+class Page:
+    """One page of a listing, with the total computed as the count mode asks."""
+
+    def __init__(self, items, page, per_page, total, has_next):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        # An estimate can trail the rows actually there
+        return max(ceil(self.total / self.per_page), self.page if self.items else 0)
+
+    @property
+    def next_page(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def prev_page(self):
+        return self.page - 1 if self.page > 1 else None
+
+
+def paginate(query, page, per_page, count, estimate):
+    """OFFSET pagination of `query` with a total for `count` mode.
+
+    'exact' issues COUNT(*) as Query.paginate() does; 'estimate' calls
+    `estimate()` instead; 'none' leaves total and pages out. Without an
+    exact count, one extra row is fetched to tell whether a next page exists.
+    """
+    if count == 'exact':
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        return Page(pagination.items, page, per_page, pagination.total, pagination.has_next)
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    total = estimate() if count == 'estimate' else None
+    return Page(rows[:per_page], page, per_page, total, len(rows) > per_page)
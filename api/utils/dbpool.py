@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger('api.app.pool')
+
+
+class PoolStats:
+    """Cumulative checkout counters for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited, timed_out, slow_threshold):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if timed_out:
+                self.timeouts += 1
+            if slow_threshold and waited >= slow_threshold:
+                self.slow_checkouts += 1
+                return True
+        return False
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that measures how long each checkout waits for a connection.
+
+    The wait includes opening a new connection when the pool grows into its
+    overflow. Checkouts slower than `slow_checkout` seconds are logged, and
+    `on_checkout(waited, timed_out)` is called after each one if set on the
+    pool (see watch_checkouts()).
+    """
+
+    slow_checkout = None
+    on_checkout = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep reporting from it
+        pool = super().recreate()
+        pool.on_checkout = self.on_checkout
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            if self.stats.record(waited, timed_out, self.slow_checkout):
+                logger.warning('Waited %.1f ms for a database connection (%s)', waited * 1000, self.status())
+            if self.on_checkout is not None:
+                self.on_checkout(waited, timed_out)
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS built from the DB_* settings in Config."""
+    url = config.get('SQLALCHEMY_DATABASE_URI')
+    if not url:
+        return {}
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # Flask-SQLAlchemy puts in-memory SQLite on a StaticPool, which has no sizes to tune
+        return {}
+
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', -1),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', False)
+    }
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout and url.get_backend_name() == 'postgresql':
+        # Set per connection at startup, so it also covers connections made later in overflow
+        options['connect_args'] = {'options': f'-c statement_timeout={int(statement_timeout)}'}
+    return options
+
+
+def init_pool_stats(app):
+    slow_checkout_ms = app.config.get('DB_SLOW_CHECKOUT_MS')
+    TimedQueuePool.slow_checkout = slow_checkout_ms / 1000 if slow_checkout_ms else None
+
+
+def watch_checkouts(engine, callback):
+    """Call `callback(waited, timed_out)` after every checkout from this engine's pool.
+
+    Pass None to stop. Engines whose pool isn't a TimedQueuePool (in-memory
+    SQLite) have no waits to report and are left alone.
+    """
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.on_checkout = callback
+
+
+def pool_status(engine):
+    """Current usage and cumulative checkout statistics of an engine's pool."""
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(),
+                      overflow=max(pool.overflow(), 0))
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        status.update(
+            checkouts=stats.checkouts,
+            timeouts=stats.timeouts,
+            slow_checkouts=stats.slow_checkouts,
+            avg_wait_ms=round(stats.wait_total / stats.checkouts * 1000, 3) if stats.checkouts else 0.0,
+            max_wait_ms=round(stats.wait_max * 1000, 3)
+        )
+    return status
@@ -0,0 +1,61 @@
+import hashlib
+from flask import request, make_response
+
+
+# Served with the row but kept up to date by UPDATEs that leave updated_at
+# alone (api.utils.counters), so they count towards its version separately
+COUNTER_COLUMNS = ('comment_count', 'last_comment_at')
+
+
+def _version(obj):
+    written = obj.updated_at or obj.created_at
+    version = written.isoformat() if written else ''
+    # Only counters already loaded: a `fields` selection that leaves them out
+    # doesn't serve them, and reading them would cost another query
+    loaded = vars(obj)
+    for name in COUNTER_COLUMNS:
+        if name in loaded:
+            value = loaded[name]
+            version += f":{value.isoformat() if hasattr(value, 'isoformat') else value}"
+    return version
+
+
+def object_etag(obj, *variant):
+    """Strong ETag for a single row, derived from its id, last write time and counters.
+
+    `variant` distinguishes representations of the same row, e.g. a `fields`
+    selection.
+    """
+    raw = f"{obj.__tablename__}:{obj.id}:{_version(obj)}"
+    if variant:
+        raw += f':{variant}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def collection_etag(rows, *extra):
+    """Weak ETag for a page of rows.
+
+    Derived from the id and version (last write time and counters) of every
+    row on the page, so a row that changed or was swapped for another one
+    changes the tag, plus any extra listing metadata such as totals.
+    """
+    digest = hashlib.sha1(f'{len(rows)}:{extra}'.encode())
+    for row in rows:
+        digest.update(row.id.bytes)
+        digest.update(_version(row).encode())
+    return digest.hexdigest()
+
+
+def not_modified(etag, weak=False):
+    """Return an empty 304 response if the client already holds `etag`."""
+    # If-None-Match always uses weak comparison (RFC 9110, 13.1.2)
+    if request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+        response.set_etag(etag, weak=weak)
+        return response
+    return None
+
+
+def with_etag(response, etag, weak=False):
+    response.set_etag(etag, weak=weak)
+    return response
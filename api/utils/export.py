@@ -0,0 +1,62 @@
+import json
+from datetime import datetime
+from uuid import UUID
+from flask import Response, request, jsonify, stream_with_context
+from sqlalchemy import func, or_, select
+from api.models.blogmodels import db, User, BlogPost, Comment
+
+EXPORT_BATCH_SIZE = 1000
+
+# Exported tables and their columns; password hashes never leave the database
+EXPORTS = {
+    'posts': (BlogPost, ('id', 'title', 'content', 'created_at', 'updated_at', 'author_id')),
+    'comments': (Comment, ('id', 'blog_post_id', 'user_id', 'comment', 'created_at', 'updated_at')),
+    'users': (User, ('id', 'username', 'email', 'firstname', 'lastname', 'created_at', 'updated_at',
+                     'is_active', 'role')),
+}
+
+
+def _default(value):
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def export_statement(name, since=None, batch_size=EXPORT_BATCH_SIZE):
+    model, columns = EXPORTS[name]
+    statement = select(*[getattr(model, column) for column in columns])
+    if since is not None:
+        statement = statement.where(or_(model.created_at >= since, model.updated_at >= since))
+    # yield_per streams through a server-side cursor where the driver has one,
+    # so only one batch of rows is ever held in memory
+    return statement.order_by(model.created_at, model.id).execution_options(yield_per=batch_size)
+
+
+def iter_ndjson(name, since=None, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the table as newline-delimited JSON, one chunk per fetched batch."""
+    result = db.session.execute(export_statement(name, since, batch_size))
+    for rows in result.partitions():
+        yield ''.join(json.dumps(row._asdict(), default=_default) + '\n' for row in rows)
+
+
+def parse_since(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+def ndjson_response(name):
+    """Stream an export for a route, honouring the `since` query parameter.
+
+    X-Export-Started-At carries the database time the export began; pass it
+    as `since` on the next run to pick up only rows created or updated later.
+    """
+    try:
+        since = parse_since(request.args.get('since'))
+    except ValueError:
+        return jsonify({'error': 'Invalid since timestamp'}), 400
+
+    started_at = db.session.scalar(select(func.now()))
+    response = Response(stream_with_context(iter_ndjson(name, since)), mimetype='application/x-ndjson')
+    response.headers['X-Export-Started-At'] = started_at.isoformat()
+    return response
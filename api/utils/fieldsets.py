@@ -0,0 +1,36 @@
+from flask import request
+from sqlalchemy.orm import load_only
+
+# Always loaded, even when not requested: ids and timestamps drive cursors and ETags
+BOOKKEEPING_COLUMNS = ('id', 'created_at', 'updated_at')
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(allowed):
+    """Read the comma-separated `fields` query parameter.
+
+    Returns None when the parameter is absent (every field), otherwise the
+    requested names in order. Raises InvalidFields for unknown names.
+    """
+    value = request.args.get('fields')
+    if value is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = set(names) - set(allowed)
+    if not names or unknown:
+        raise InvalidFields(', '.join(sorted(unknown)) or 'no fields given')
+    return names
+
+
+def load_only_fields(model, fields, *required):
+    """Query option that loads only the columns behind `fields`.
+
+    Everything else (notably BlogPost.content) is deferred and never read
+    from the database unless accessed.
+    """
+    columns = {name for name in fields if name in model.__table__.columns}
+    columns.update(BOOKKEEPING_COLUMNS, required)
+    return load_only(*[getattr(model, name) for name in sorted(columns)])
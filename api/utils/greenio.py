@@ -0,0 +1,50 @@
+import logging
+
+logger = logging.getLogger('api.app')
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that yields to the gevent hub while a query runs.
+
+    With it installed every connection runs in psycopg2's asynchronous mode,
+    so a greenlet waiting on the database lets the worker serve others
+    instead of blocking it in libpq (the same technique as psycogreen).
+    """
+    from gevent.socket import wait_read, wait_write
+    from psycopg2 import extensions, OperationalError
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f'Bad result from poll: {state!r}')
+
+
+def make_psycopg_green():
+    """Install gevent_wait_callback for every psycopg2 connection in the process."""
+    from psycopg2 import extensions
+
+    if extensions.get_wait_callback() is not gevent_wait_callback:
+        extensions.set_wait_callback(gevent_wait_callback)
+
+
+def init_green_db(app):
+    """Make psycopg2 cooperative when DB_GREEN_WAIT is set.
+
+    The standard library must already be monkey-patched, as gunicorn's gevent
+    worker does before loading the app (or api.green for other servers);
+    otherwise greenlets still block in the connection pool's locks.
+    """
+    if not app.config.get('DB_GREEN_WAIT'):
+        return
+    from gevent import monkey
+
+    if not monkey.is_module_patched('socket'):
+        logger.warning('DB_GREEN_WAIT is set but gevent has not patched the standard library; '
+                       'serve with gunicorn --worker-class gevent or api.green:app')
+    make_psycopg_green()
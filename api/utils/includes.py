@@ -0,0 +1,71 @@
+from collections import defaultdict
+from flask import current_app, request
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+from api.models.blogmodels import db
+
+
+class InvalidInclude(ValueError):
+    pass
+
+
+def parse_include(allowed):
+    """Read the comma-separated `include` query parameter.
+
+    Returns the set of requested relationships; raises InvalidInclude if
+    any of them is not in `allowed`.
+    """
+    value = request.args.get('include', '')
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise InvalidInclude(', '.join(sorted(unknown)))
+    return names
+
+
+def include_limit(name):
+    """How many `name` rows are embedded per parent (INCLUDE_MAX_COMMENTS, ...)."""
+    return current_app.config.get(f'INCLUDE_MAX_{name.upper()}', 5)
+
+
+def latest_children(model, parent_key, parent_ids, limit):
+    """Fetch the newest `limit` rows of `model` for every parent in one query.
+
+    A row_number() window partitioned by the parent key caps each parent
+    independently, which selectinload() can't do; the (parent, created_at)
+    indexes serve both the filter and the ordering. Returns a dict mapping
+    each parent id to its rows, newest first.
+    """
+    children = defaultdict(list)
+    if not parent_ids or limit < 1:
+        return children
+
+    key = getattr(model, parent_key)
+    position = func.row_number().over(partition_by=key,
+                                      order_by=(model.created_at.desc(), model.id.desc()))
+    ranked = select(model, position.label('position')).where(key.in_(parent_ids)).subquery()
+    child = aliased(model, ranked)
+    statement = select(child).where(ranked.c.position <= limit).order_by(
+        getattr(child, parent_key), ranked.c.position)
+
+    for row in db.session.scalars(statement):
+        children[getattr(row, parent_key)].append(row)
+    return children
+
+
+def embedded_rows(embeds):
+    """Every row pulled in by `include`, for ETag computation."""
+    for related in embeds.values():
+        for value in related.values():
+            if isinstance(value, list):
+                yield from value
+            elif value is not None:
+                yield value
+
+
+def embed(items, rows, embeds, dumpers):
+    """Attach the relationships, serialized by `dumpers[name]`, to already dumped `items`."""
+    for data, row in zip(items, rows):
+        for name, related in embeds.items():
+            data[name] = dumpers[name](related[row.id])
+    return items
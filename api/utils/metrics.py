@@ -0,0 +1,154 @@
+import os
+import time
+from flask import g, got_request_exception, request
+from sqlalchemy import event
+from api.utils.dbpool import watch_checkouts
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+# Label of requests that matched no route, so stray URLs can't multiply series
+UNMATCHED = '<unmatched>'
+
+
+class Metrics:
+    """Prometheus request, error and connection pool metrics.
+
+    Requests are labelled by endpoint (e.g. 'blog.get_blog_posts'). 5xx
+    responses are counted whether or not the route caught the error itself;
+    exceptions that escape a route are also counted by class. With
+    PROMETHEUS_MULTIPROC_DIR set, every gunicorn worker writes its samples to
+    mmap-backed files in that directory and /metrics adds them all up, so
+    the scrape is the same whichever worker serves it. Needs the
+    prometheus_client package; nothing is recorded unless METRICS_ENABLED.
+
+    Collectors go to `registry` (prometheus_client's default one if None),
+    and pool metrics come from the engines of the app's Flask-SQLAlchemy
+    extension only, so init_app must follow db.init_app().
+    """
+
+    def __init__(self, registry=None):
+        self.enabled = False
+        self.registry = registry
+        self.requests = None
+        self._apps = []
+        self._engines = []
+
+    def _create_collectors(self):
+        from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+
+        registry = self.registry if self.registry is not None else REGISTRY
+        self.requests = Counter('http_requests_total', 'HTTP requests served',
+                                ['endpoint', 'method', 'status'], registry=registry)
+        self.latency = Histogram('http_request_duration_seconds', 'Time to produce a response',
+                                 ['endpoint', 'method'], buckets=LATENCY_BUCKETS, registry=registry)
+        self.response_size = Histogram('http_response_size_bytes', 'Response body size',
+                                       ['endpoint'], buckets=SIZE_BUCKETS, registry=registry)
+        self.exceptions = Counter('http_request_exceptions_total', 'Unhandled exceptions by class',
+                                  ['endpoint', 'exception'], registry=registry)
+        self.server_errors = Counter('http_server_errors_total', '5xx responses, handled errors included',
+                                     ['endpoint', 'status'], registry=registry)
+        self.pool_in_use = Gauge('db_pool_connections_in_use', 'Connections checked out of the pool',
+                                 multiprocess_mode='livesum', registry=registry)
+        self.pool_opened = Counter('db_pool_connections_opened_total', 'New database connections',
+                                   registry=registry)
+        self.pool_wait = Histogram('db_pool_checkout_wait_seconds', 'Time waited for a pooled connection',
+                                   buckets=LATENCY_BUCKETS, registry=registry)
+        self.pool_timeouts = Counter('db_pool_checkout_timeouts_total', 'Checkouts that hit DB_POOL_TIMEOUT',
+                                     registry=registry)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        # Registering the same names twice in one registry is an error
+        if self.requests is None:
+            self._create_collectors()
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        got_request_exception.connect(self._exception, app, weak=False)
+        self._apps.append(app)
+
+        if 'sqlalchemy' in app.extensions:
+            with app.app_context():
+                engines = list(app.extensions['sqlalchemy'].engines.values())
+            for engine in engines:
+                event.listen(engine, 'checkout', self._checkout)
+                event.listen(engine, 'checkin', self._checkin)
+                event.listen(engine, 'connect', self._connect)
+                watch_checkouts(engine, self._checkout_waited)
+                self._engines.append(engine)
+
+    def detach(self):
+        """Remove the signal and pool hooks init_app installed (they outlive the app otherwise)."""
+        for app in self._apps:
+            got_request_exception.disconnect(self._exception, app)
+        for engine in self._engines:
+            event.remove(engine, 'checkout', self._checkout)
+            event.remove(engine, 'checkin', self._checkin)
+            event.remove(engine, 'connect', self._connect)
+            watch_checkouts(engine, None)
+        self._apps, self._engines = [], []
+
+    @staticmethod
+    def _start():
+        g.metrics_started = time.perf_counter()
+
+    def _finish(self, response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or UNMATCHED
+        self.latency.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        self.requests.labels(endpoint, request.method, str(response.status_code)).inc()
+        # Routes catch their own SQLAlchemyErrors and answer 500, which never
+        # reaches got_request_exception, so server errors are counted here too
+        if response.status_code >= 500:
+            self.server_errors.labels(endpoint, str(response.status_code)).inc()
+        # Streamed responses (the exports) have no length up front
+        if response.content_length is not None:
+            self.response_size.labels(endpoint).observe(response.content_length)
+        return response
+
+    def _exception(self, sender, exception, **extra):
+        self.exceptions.labels(request.endpoint or UNMATCHED, type(exception).__name__).inc()
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.pool_in_use.inc()
+
+    def _checkin(self, dbapi_connection, connection_record):
+        self.pool_in_use.dec()
+
+    def _connect(self, dbapi_connection, connection_record):
+        self.pool_opened.inc()
+
+    def _checkout_waited(self, waited, timed_out):
+        self.pool_wait.observe(waited)
+        if timed_out:
+            self.pool_timeouts.inc()
+
+    def exposition(self):
+        """(body, content type) of the metrics in Prometheus text format."""
+        from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+        if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+            from prometheus_client import multiprocess
+
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = self.registry if self.registry is not None else REGISTRY
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid):
+    """Drop a gunicorn worker's live gauges once it exits (gunicorn's child_exit hook)."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+metrics = Metrics()
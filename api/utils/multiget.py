@@ -0,0 +1,50 @@
+from flask import current_app, request
+from api.utils.cache import to_uuid
+
+
+class InvalidIds(ValueError):
+    pass
+
+
+def requested_ids():
+    """Ids asked for by a multi-get request, in order and without duplicates.
+
+    GET takes `ids=` as a comma-separated list (or repeated); POST takes a
+    JSON body {"ids": [...]} for lists too long for a URL. Raises InvalidIds
+    when there are none or more than MULTIGET_MAX_IDS.
+    """
+    if request.method == 'POST':
+        data = request.get_json(silent=True)
+        ids = data.get('ids') if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(value, str) for value in ids):
+            raise InvalidIds('Expected an "ids" list of strings')
+        ids = [value.strip() for value in ids]
+    else:
+        ids = [value.strip() for values in request.args.getlist('ids') for value in values.split(',')]
+
+    ids = list(dict.fromkeys(value for value in ids if value))
+    if not ids:
+        raise InvalidIds('No ids given')
+    limit = current_app.config.get('MULTIGET_MAX_IDS', 100)
+    if len(ids) > limit:
+        raise InvalidIds(f'At most {limit} ids per request')
+    return ids
+
+
+def fetch_by_ids(query, model, ids):
+    """Rows of `query` with the given ids, in the order asked, from one IN (...) query.
+
+    Returns the rows found and the requested ids that matched no row
+    (malformed ids included), as given.
+    """
+    wanted = {value: to_uuid(value) for value in ids}
+    keys = set(wanted.values()) - {None}
+    rows = {row.id: row for row in query.filter(model.id.in_(keys))} if keys else {}
+
+    found, missing = [], []
+    for value, key in wanted.items():
+        if key in rows:
+            found.append(rows[key])
+        else:
+            missing.append(value)
+    return found, missing
@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from flask import current_app
+from sqlalchemy import literal, tuple_
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_keys(*values):
+    """Pack sort-key values into an opaque, URL-safe cursor."""
+    payload = json.dumps([value.isoformat() if isinstance(value, datetime)
+                          else str(value) if isinstance(value, UUID) else value
+                          for value in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_keys(cursor, count):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list) or len(values) != count:
+        raise InvalidCursor(cursor)
+    return values
+
+
+def encode_cursor(created_at, row_id):
+    """Build the opaque cursor pointing just past the given row."""
+    return encode_keys(created_at, row_id)
+
+
+def decode_cursor(cursor):
+    created_at, row_id = decode_keys(cursor, 2)
+    try:
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor(cursor)
+
+
+def clamp_per_page(per_page):
+    return min(per_page, current_app.config.get('MAX_PER_PAGE', 100))
+
+
+def keyset_clauses(model, cursor, descending=True):
+    """WHERE and ORDER BY clauses seeking past `cursor` in (created_at, id) order."""
+    filters = []
+    if cursor:
+        keys = tuple_(model.created_at, model.id)
+        created_at, row_id = decode_cursor(cursor)
+        # Bind with the column types so dialect variants (e.g. SQLite's
+        # timestamp format) apply to the right-hand side of the row comparison
+        bound = tuple_(literal(created_at, model.created_at.type), literal(row_id, model.id.type))
+        filters.append(keys < bound if descending else keys > bound)
+
+    if descending:
+        order_by = (model.created_at.desc(), model.id.desc())
+    else:
+        order_by = (model.created_at.asc(), model.id.asc())
+    return filters, order_by
+
+
+def split_page(rows, per_page):
+    """Split the look-ahead row off a page fetched with LIMIT per_page + 1.
+
+    Returns the rows of the page and the cursor of the next page, which is
+    None once the listing is exhausted.
+    """
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
+
+
+def keyset_paginate(query, model, cursor, per_page, descending=True):
+    """Seek to the page after `cursor` ordered by (created_at, id).
+
+    Returns the rows of the page and the cursor of the next page, which is
+    None once the listing is exhausted. No OFFSET and no COUNT(*) is issued.
+    """
+    filters, order_by = keyset_clauses(model, cursor, descending)
+    rows = query.filter(*filters).order_by(*order_by).limit(per_page + 1).all()
+    return split_page(rows, per_page)
@@ -0,0 +1,84 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def _executor(workers):
+    """A pool of real OS threads, also when gevent has monkey-patched threading.
+
+    hashlib's pbkdf2 and scrypt release the GIL, so hashing runs in parallel
+    with request handling. Under gevent, gevent's own executor lets the
+    waiting greenlet yield to the hub instead of blocking the whole worker.
+    """
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as GeventThreadPoolExecutor
+            return GeventThreadPoolExecutor(max_workers=workers)
+    except ImportError:
+        pass
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords off the request thread.
+
+    The method and cost come from PASSWORD_HASH_METHOD in werkzeug's format
+    (e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000'); PASSWORD_HASH_WORKERS
+    bounds the pool, and 0 hashes inline.
+    """
+
+    def __init__(self):
+        self.method = 'scrypt'
+        self.workers = 0
+        self._prefix = None
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', 'scrypt')
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', 4)
+        self._prefix = None
+        app.extensions['password_hasher'] = self
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        return self._executor().submit(function, *args).result()
+
+    def _executor(self):
+        # Created lazily, and again after a fork, since threads don't survive
+        # into gunicorn's worker processes
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    self._pool = _executor(self.workers)
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """Hash several passwords concurrently, in input order."""
+        if not self.workers:
+            return [generate_password_hash(password, self.method) for password in passwords]
+        pool = self._executor()
+        futures = [pool.submit(generate_password_hash, password, self.method) for password in passwords]
+        return [future.result() for future in futures]
+
+    def verify(self, stored, password):
+        return self._run(check_password_hash, stored, password)
+
+    def needs_rehash(self, stored):
+        """Whether `stored` was hashed with other parameters than the configured ones."""
+        if self._prefix is None:
+            # werkzeug fills in default costs ('scrypt' -> 'scrypt:32768:8:1'),
+            # so take the canonical prefix from a real hash
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return stored.split('$', 1)[0] != self._prefix
+
+
+password_hasher = PasswordHasher()
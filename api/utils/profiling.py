@@ -0,0 +1,120 @@
+import logging
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('api.app.profile')
+
+# Literals and bind placeholders of every DBAPI paramstyle; '::' casts are kept
+_VALUES = re.compile(r"'(?:[^']|'')*'|\$\d+|%\(\w+\)s|%s|(?<![:\w]):\w+|\b\d+(?:\.\d+)?\b")
+_VALUE_LISTS = re.compile(r'\?(?:\s*,\s*\?)+')
+
+
+def normalize_sql(statement):
+    """A statement with whitespace collapsed and every value replaced by `?`.
+
+    Expanded IN lists become a single `?`, so queries differing only in their
+    parameters normalize to the same string.
+    """
+    return _VALUE_LISTS.sub('?', _VALUES.sub('?', ' '.join(statement.split())))
+
+
+class RequestProfile:
+    """SQL statements executed while serving one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        self.statements[statement] += 1
+
+
+class SqlProfiler:
+    """Counts queries and database time per request.
+
+    With SQL_PROFILING on, each response gets a Server-Timing header, and
+    slow requests, slow statements and statements repeated more than
+    N_PLUS_ONE_THRESHOLD times in one request (the N+1 pattern) are logged.
+    Off, no cursor events are listened to and each request costs one
+    attribute check.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.slow_request = 0.5
+        self.slow_query = 0.1
+        self.repeat_threshold = 5
+
+    def init_app(self, app):
+        self.slow_request = app.config.get('SLOW_REQUEST_MS', 500) / 1000
+        self.slow_query = app.config.get('SLOW_QUERY_MS', 100) / 1000
+        self.repeat_threshold = app.config.get('N_PLUS_ONE_THRESHOLD', 5)
+        # Registered regardless, since request hooks can't be added once serving starts
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.extensions['sql_profiler'] = self
+        if app.config.get('SQL_PROFILING'):
+            self.enable()
+
+    def enable(self):
+        if not self.enabled:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self.enabled = True
+
+    def disable(self):
+        if self.enabled:
+            event.remove(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.remove(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self.enabled = False
+
+    def _start(self):
+        # Reset even when disabled: g outlives the request under a pushed app context (tests, CLI)
+        g.sql_profile = RequestProfile() if self.enabled else None
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('profile_started')
+        if not started:
+            # Profiling was switched on while this statement ran
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile = g.get('sql_profile') if has_request_context() else None
+        if profile is None:
+            return
+        normalized = normalize_sql(statement)
+        profile.record(normalized, elapsed)
+        if elapsed >= self.slow_query:
+            logger.warning('Slow query (%.1f ms) in %s: %s', elapsed * 1000, request.endpoint, normalized)
+
+    def _finish(self, response):
+        profile = g.pop('sql_profile', None)
+        if profile is None:
+            return response
+
+        total = time.perf_counter() - profile.started
+        response.headers.add('Server-Timing', f'db;dur={profile.db_time * 1000:.1f};desc="{profile.queries} queries"')
+        response.headers.add('Server-Timing', f'app;dur={total * 1000:.1f}')
+
+        if total >= self.slow_request:
+            logger.warning('Slow request (%.1f ms, %d queries, %.1f ms in the database): %s %s',
+                           total * 1000, profile.queries, profile.db_time * 1000, request.method, request.path)
+        for statement, count in profile.statements.most_common():
+            if count <= self.repeat_threshold:
+                break
+            logger.warning('Possible N+1 in %s: statement run %d times: %s', request.endpoint, count, statement)
+        return response
+
+
+sql_profiler = SqlProfiler()
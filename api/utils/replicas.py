@@ -0,0 +1,124 @@
+import itertools
+from flask import g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+from api.utils.dbpool import engine_options
+
+# Blueprints whose GET routes only read, and may therefore use a replica
+READ_ONLY_BLUEPRINTS = {'blog', 'comments', 'users'}
+# POST routes that only read (multi-gets with the ids in the body)
+READ_ONLY_POST_ENDPOINTS = {'blog.lookup_blog_posts', 'comments.get_comments_by_ids', 'users.lookup_users'}
+
+
+def is_read_only_request():
+    if request.method in ('GET', 'HEAD'):
+        return request.blueprint in READ_ONLY_BLUEPRINTS
+    return request.method == 'POST' and request.endpoint in READ_ONLY_POST_ENDPOINTS
+
+
+def make_pin_store(config):
+    """Store for read-your-writes pins, kept apart from the model cache.
+
+    Pins must not compete with cached rows for LRU slots, vanish with
+    CACHE_BACKEND=null or be dropped by a cache clear(). With
+    CACHE_BACKEND=redis they go to the same server under their own prefix,
+    so every worker sees them; otherwise to a per-process store.
+    """
+    # Imported here: the model cache itself imports this module
+    from api.utils.cache import MemoryCache, RedisCache
+
+    if config.get('CACHE_BACKEND') == 'redis':
+        return RedisCache(config['CACHE_REDIS_URL'], prefix='blog-pins:')
+    return MemoryCache(config.get('REPLICA_PIN_MAX_ENTRIES', 100000))
+
+
+def routed_to_replica():
+    """Whether the current request reads from a replica."""
+    return has_request_context() and g.get('db_replica') is not None
+
+
+def pinned_to_primary():
+    """Whether the current request's user wrote recently and must read from the primary."""
+    return has_request_context() and g.get('db_pinned', False)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the replica chosen for the current request.
+
+    Flushes and INSERT/UPDATE/DELETE statements always go to the primary, so
+    a stray write in a read-only route still lands in the right place.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not getattr(clause, 'is_dml', False) \
+                and has_request_context():
+            replica = g.get('db_replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    """Round-robins read-only requests over DATABASE_REPLICA_URLS.
+
+    After a successful write, the writing user is pinned to the primary for
+    REPLICA_PIN_SECONDS so they read their own writes despite replication
+    lag. Pins live in `pins` (see make_pin_store); use CACHE_BACKEND=redis
+    for them to hold across worker processes. Pinned requests bypass the
+    model cache, and replica reads never fill it.
+    """
+
+    def __init__(self):
+        self.engines = []
+        self.pins = None
+        self.pin_seconds = 5
+        self._counter = itertools.count()
+
+    def init_app(self, app, pins=None):
+        self.pins = pins if pins is not None else make_pin_store(app.config)
+        self.engines = [create_engine(url, **engine_options({**app.config, 'SQLALCHEMY_DATABASE_URI': url}))
+                        for url in app.config.get('DATABASE_REPLICA_URLS', [])]
+        self.pin_seconds = app.config.get('REPLICA_PIN_SECONDS', 5)
+        app.before_request(self._choose_bind)
+        app.after_request(self._pin_writer)
+        app.extensions['replica_router'] = self
+
+    def next_engine(self):
+        return self.engines[next(self._counter) % len(self.engines)]
+
+    @staticmethod
+    def _pin_key(identity):
+        return f'replica-pin:{identity}'
+
+    @staticmethod
+    def _identity():
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt_identity()
+        except Exception:
+            # Invalid tokens are rejected by the route itself
+            return None
+
+    def _choose_bind(self):
+        # g outlives the request when an app context was already pushed (CLI, tests)
+        g.db_replica = None
+        g.db_pinned = False
+        if not self.engines or not is_read_only_request():
+            return
+        identity = self._identity()
+        if identity is not None and self.pins.get(self._pin_key(identity)):
+            g.db_pinned = True
+            return
+        g.db_replica = self.next_engine()
+
+    def _pin_writer(self, response):
+        if self.engines and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400 \
+                and not is_read_only_request():
+            identity = self._identity()
+            if identity is not None:
+                self.pins.set(self._pin_key(identity), True, self.pin_seconds)
+        return response
+
+
+replica_router = ReplicaRouter()
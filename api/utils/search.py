@@ -0,0 +1,96 @@
+import html
+from uuid import UUID
+from sqlalchemy import and_, bindparam, func, literal_column, or_, select, text
+from api.models.blogmodels import db, BlogPost
+from api.utils.pagination import InvalidCursor, decode_keys, encode_keys
+
+# A literal rather than a bind parameter, so drivers with typed parameters
+# don't send the configuration name as text
+SEARCH_CONFIG = literal_column("'english'::regconfig")
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+# Placeholders the database wraps matches in; the snippet is HTML-escaped
+# before they become tags, so post content can't add markup of its own
+START_MARKER = '\x02'
+STOP_MARKER = '\x03'
+
+
+def _decode_search_cursor(cursor):
+    rank, row_id = decode_keys(cursor, 2)
+    try:
+        return float(rank), UUID(row_id)
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def _postgres_search(q, after, per_page):
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(literal_column('blog_posts.search_vector'), query)
+
+    # Rank and page on the GIN index first, then build snippets for the page only
+    page = select(BlogPost.id, rank.label('rank')).where(
+        literal_column('blog_posts.search_vector').op('@@')(query))
+    if after:
+        after_rank, after_id = after
+        page = page.where(or_(rank < after_rank, and_(rank == after_rank, BlogPost.id > after_id)))
+    page = page.order_by(rank.desc(), BlogPost.id).limit(per_page + 1).subquery()
+
+    options = f'StartSel={START_MARKER}, StopSel={STOP_MARKER}, MaxFragments=2, MaxWords=30, MinWords=10'
+    statement = select(
+        BlogPost.id, BlogPost.title, BlogPost.author_id, BlogPost.created_at, page.c.rank,
+        func.ts_headline(SEARCH_CONFIG, BlogPost.content, query, options).label('snippet')
+    ).join(page, page.c.id == BlogPost.id).order_by(page.c.rank.desc(), BlogPost.id)
+    return db.session.execute(statement).all()
+
+
+def _sqlite_search(q, after, per_page):
+    # FTS5 fallback; quote every term so user input can't inject query syntax
+    match = ' '.join('"' + term.replace('"', '""') + '"' for term in q.split())
+    keyset = 'WHERE rank < :after_rank OR (rank = :after_rank AND id > :after_id)' if after else ''
+    statement = text(f"""
+        SELECT id, title, author_id, created_at, rank, snippet FROM (
+            SELECT p.id, p.title, p.author_id, p.created_at,
+                   -bm25(blog_posts_fts, 0.0, 10.0, 1.0) AS rank,
+                   snippet(blog_posts_fts, 2, :start, :stop, '...', 20) AS snippet
+            FROM blog_posts_fts JOIN blog_posts p ON p.id = blog_posts_fts.post_id
+            WHERE blog_posts_fts MATCH :match
+        ) {keyset}
+        ORDER BY rank DESC, id
+        LIMIT :limit
+    """).columns(id=BlogPost.id.type, author_id=BlogPost.author_id.type,
+                 created_at=BlogPost.created_at.type)
+
+    params = {'match': match, 'start': START_MARKER, 'stop': STOP_MARKER, 'limit': per_page + 1}
+    if after:
+        statement = statement.bindparams(bindparam('after_id', type_=BlogPost.id.type))
+        params.update(after_rank=after[0], after_id=after[1])
+    return db.session.execute(statement, params).all()
+
+
+def highlight(snippet):
+    """HTML-escaped snippet with the matches wrapped in <mark> tags."""
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(START_MARKER, HIGHLIGHT_START).replace(STOP_MARKER, HIGHLIGHT_STOP)
+
+
+def search_posts(q, cursor, per_page):
+    """Ranked full-text search over post titles and content.
+
+    Returns (rows, next_cursor); each row has id, title, author_id,
+    created_at, rank and a snippet of the content with the matches between
+    markers, for highlight() to render. Pages are keyed on (rank, id), so
+    results don't shift between pages; every page still ranks all matching
+    posts.
+    """
+    after = _decode_search_cursor(cursor) if cursor else None
+    if db.engine.dialect.name == 'postgresql':
+        rows = _postgres_search(q, after, per_page)
+    else:
+        rows = _sqlite_search(q, after, per_page)
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_keys(rows[-1].rank, rows[-1].id)
+    return rows, next_cursor
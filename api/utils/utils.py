@@ -1,5 +1,6 @@
 from api.models.blogmodels import User
+from api.utils.cache import model_cache
 
 def is_admin(user_id):
-    user = User.query.get(user_id)
-    return user.role == 'admin' if user else False
\ No newline at end of file
+    user = model_cache.get(User, user_id)
+    return user.role == 'admin' if user else False
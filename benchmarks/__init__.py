@@ -0,0 +1 @@
+"""Performance benchmarks for the blog API. Run modules with `python -m benchmarks.<name>`."""
@@ -0,0 +1,142 @@
+"""Read throughput of the ASGI entry point versus gunicorn's gevent worker.
+
+Starts both servers on the same database and drives GET /blog_posts and
+GET /blog_posts/<id> with the same number of concurrent connections:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.asgi_vs_wsgi --connections 1000 --duration 30
+
+Needs gunicorn, gevent, uvicorn, starlette, httpx and the async driver of the
+database (asyncpg; aiosqlite for a quick run on SQLite). Without DATABASE_URL
+a throwaway SQLite file is used, which serializes writers but is fine for
+this read-only load.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import tempfile
+import time
+
+SERVERS = {
+    'wsgi': ['gunicorn', '-k', 'gevent', '--worker-connections', '{connections}', '-w', '{workers}',
+             '-b', '127.0.0.1:{port}', 'api.app:app'],
+    'asgi': ['uvicorn', '--workers', '{workers}', '--host', '127.0.0.1', '--port', '{port}',
+             '--no-access-log', 'api.asgi:app'],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, default=1000, help='concurrent client connections')
+    parser.add_argument('--duration', type=float, default=20, help='seconds of load per server')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes per server')
+    parser.add_argument('--posts', type=int, default=1000, help='posts to seed')
+    parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['wsgi', 'asgi'])
+    parser.add_argument('--port', type=int, default=8700)
+    return parser.parse_args()
+
+
+def seed(posts):
+    from api.app import app
+    from api.models.blogmodels import db, User, BlogPost
+
+    with app.app_context():
+        db.create_all()
+        user = User.query.filter_by(username='bench').first()
+        if user is None:
+            user = User(username='bench', email='bench@example.com', firstname='Bench', lastname='Mark')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.flush()
+        missing = posts - BlogPost.query.count()
+        db.session.add_all(BlogPost(title=f'Post {i}', content='Lorem ipsum dolor sit amet. ' * 40,
+                                    author_id=user.id) for i in range(max(missing, 0)))
+        db.session.commit()
+        return [str(post_id) for (post_id,) in db.session.query(BlogPost.id).limit(100)]
+
+
+def start(name, port, workers, connections):
+    command = [part.format(port=port, workers=workers, connections=connections) for part in SERVERS[name]]
+    return subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_until_up(client, base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.post(f'{base_url}/api/v1/login', json={})
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def load(base_url, post_ids, connections, duration):
+    import httpx
+
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await wait_until_up(client, base_url)
+        response = await client.post(f'{base_url}/api/v1/login',
+                                     json={'identifier': 'bench', 'password': 'bench-password'})
+        headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+        urls = [f'{base_url}/api/v1/blog_posts?per_page=20']
+        urls += [f'{base_url}/api/v1/blog_posts/{post_id}' for post_id in post_ids]
+
+        latencies, errors = [], 0
+        deadline = time.monotonic() + duration
+
+        async def connection(offset):
+            nonlocal errors
+            i = offset
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(urls[i % len(urls)], headers=headers)
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(connection(offset) for offset in range(connections)))
+        return latencies, errors, time.perf_counter() - started
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000 if ordered else float('nan')
+
+
+def main():
+    args = parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "asgi-benchmark.db")}'
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-of-sufficient-length')
+    os.environ.pop('FLASK_ENV', None)
+    post_ids = seed(args.posts)
+
+    print(f'{args.connections} connections, {args.duration:g}s, {args.workers} workers per server')
+    for offset, name in enumerate(args.servers):
+        port = args.port + offset
+        server = start(name, port, args.workers, args.connections)
+        try:
+            latencies, errors, elapsed = asyncio.run(
+                load(f'http://127.0.0.1:{port}', post_ids, args.connections, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        latencies.sort()
+        print(f'  {name}  {len(latencies) / elapsed:8.1f} req/sec  '
+              f'p50 {percentile(latencies, 0.50):7.1f} ms  '
+              f'p95 {percentile(latencies, 0.95):7.1f} ms  '
+              f'p99 {percentile(latencies, 0.99):7.1f} ms  '
+              f'errors {errors}')
+
+
+if __name__ == '__main__':
+    main()
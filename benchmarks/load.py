@@ -0,0 +1,300 @@
+"""Per-endpoint latency, throughput and query counts under concurrent load.
+
+Drives every route of the blog post, comment and user blueprints in-process
+through the Flask test client, one scenario at a time:
+
+    python -m benchmarks.load --concurrency 20 --requests 500 --output results/baseline.json
+    python -m benchmarks.load --only list_posts get_post --compare results/baseline.json
+
+Without DATABASE_URL a throwaway SQLite database is seeded first (see
+benchmarks.seed for the volumes); with it, the rows already there are used,
+and --seed adds generated ones. Each scenario reports p50/p95/p99 latency,
+requests/sec, unexpected statuses and SQL statements per request. --output
+stores the run as JSON; --compare prints the change against a stored run and
+exits with status 1 when a p95 regressed by more than --threshold.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# `path` and `body` are strings/values or functions of the run's Context.
+# `prepare` creates what a destructive request consumes, outside the timing.
+Scenario = namedtuple('Scenario', 'name method path body expect prepare max_requests',
+                      defaults=(None, (200,), None, None))
+
+SCENARIOS = [
+    # blogroutes.py
+    Scenario('create_post', 'POST', '/api/v1/blog_posts',
+             lambda ctx: {'title': 'Load test', 'content': 'Body ' * 100, 'author_id': ctx.user_id}, (201,)),
+    Scenario('batch_posts', 'POST', '/api/v1/blog_posts:batch',
+             lambda ctx: {'posts': [{'title': f'Batch {i}', 'content': 'Body ' * 100, 'author_id': ctx.user_id}
+                                    for i in range(20)]}, (201,)),
+    Scenario('list_posts', 'GET', lambda ctx: f'/api/v1/blog_posts?page={ctx.rng.randint(1, 20)}'),
+    Scenario('list_posts_cursor', 'GET', '/api/v1/blog_posts?cursor='),
+    Scenario('list_posts_include', 'GET', '/api/v1/blog_posts?include=author,comments&fields=id,title,excerpt'),
+    Scenario('search_posts', 'GET', lambda ctx: f'/api/v1/blog_posts/search?q={ctx.rng.choice(ctx.words)}'),
+    Scenario('export_posts', 'GET', '/api/v1/blog_posts/export', max_requests=3),
+    Scenario('get_post', 'GET', lambda ctx: f'/api/v1/blog_posts/{ctx.pick("posts")}'),
+    Scenario('update_post', 'PUT', lambda ctx: f'/api/v1/blog_posts/{ctx.pick("posts")}',
+             {'title': 'Updated by load test'}),
+    # The route only matches integer ids, so every post id falls through to 404/405
+    Scenario('delete_post', 'DELETE', lambda ctx: f'/api/v1/blog_posts/{ctx.pick("posts")}', expect=(404, 405)),
+    # commentroutes.py
+    Scenario('create_comment', 'POST', '/api/v1/comments',
+             lambda ctx: {'blog_post_id': ctx.pick('posts'), 'user_id': ctx.user_id, 'comment': 'Load test'},
+             (201,)),
+    Scenario('batch_comments', 'POST', '/api/v1/comments:batch',
+             lambda ctx: {'comments': [{'blog_post_id': ctx.pick('posts'), 'user_id': ctx.user_id,
+                                        'comment': f'Batch {i}'} for i in range(20)]}, (201,)),
+    Scenario('list_comments', 'GET', lambda ctx: f'/api/v1/blog_posts/{ctx.pick("posts")}/comments'),
+    Scenario('list_comments_cursor', 'GET', lambda ctx: f'/api/v1/blog_posts/{ctx.pick("posts")}/comments?cursor='),
+    Scenario('export_comments', 'GET', '/api/v1/comments/export', max_requests=3),
+    Scenario('get_comment', 'GET', lambda ctx: f'/api/v1/comments/{ctx.pick("comments")}'),
+    Scenario('update_comment', 'PUT', lambda ctx: f'/api/v1/comments/{ctx.comment_id}', {'comment': 'Edited'}),
+    Scenario('delete_comment', 'DELETE', lambda ctx: f'/api/v1/comments/{ctx.prepared}',
+             prepare=lambda ctx: ctx.new_comment()),
+    # usersroutes.py
+    Scenario('create_user', 'POST', '/api/v1/users', lambda ctx: ctx.new_user_data(), (201,)),
+    Scenario('batch_users', 'POST', '/api/v1/users:batch',
+             lambda ctx: {'users': [ctx.new_user_data() for _ in range(5)]}, (201,)),
+    Scenario('list_users', 'GET', lambda ctx: f'/api/v1/users?page={ctx.rng.randint(1, 20)}'),
+    Scenario('list_users_cursor', 'GET', '/api/v1/users?cursor='),
+    Scenario('export_users', 'GET', '/api/v1/users/export', max_requests=3),
+    Scenario('get_user', 'GET', lambda ctx: f'/api/v1/users/{ctx.pick("users")}'),
+    Scenario('update_user', 'PUT', lambda ctx: f'/api/v1/users/{ctx.pick("users")}', {'is_active': True}),
+    Scenario('delete_user', 'DELETE', lambda ctx: f'/api/v1/users/{ctx.prepared}',
+             prepare=lambda ctx: ctx.new_user()),
+    Scenario('login', 'POST', '/api/v1/login', {'identifier': 'user1', 'password': 'bench-password'}),
+]
+
+
+class QueryCounter:
+    """Counts SQL statements executed by the current thread."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self):
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+
+        event.listen(Engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self._local.count = getattr(self._local, 'count', 0) + 1
+
+    def reset(self):
+        self._local.count = 0
+
+    @property
+    def count(self):
+        return getattr(self._local, 'count', 0)
+
+
+class Context:
+    """Ids, credentials and row factories shared by the scenarios of a run."""
+
+    words = ['lorem', 'postgres', 'latency', 'flask', 'cache']
+
+    def __init__(self, app, sample_size=1000):
+        from flask_jwt_extended import create_access_token
+        from api.models.blogmodels import db, User, BlogPost, Comment
+        from api.utils.cache import to_uuid
+
+        self.app = app
+        self.rng = random.Random(0)
+        self.prepared = None
+        self._serial = itertools.count()
+        self._run_id = int(time.time())
+        with app.app_context():
+            self.ids = {
+                'users': [str(i) for i in db.session.scalars(db.select(User.id).limit(sample_size))],
+                'posts': [str(i) for i in db.session.scalars(db.select(BlogPost.id).limit(sample_size))],
+                'comments': [str(i) for i in db.session.scalars(db.select(Comment.id).limit(sample_size))],
+            }
+            if not all(self.ids.values()):
+                sys.exit('The database needs users, posts and comments; run with --seed')
+            user = db.session.get(User, to_uuid(self.ids["users"][0]))
+            self.user_id = str(user.id)
+            self.headers = {'Authorization': f'Bearer {create_access_token(identity=user)}'}
+            self.comment_id = self.new_comment()
+
+    def pick(self, kind):
+        return self.rng.choice(self.ids[kind])
+
+    def new_user_data(self):
+        number = next(self._serial)
+        return {'username': f'load{self._run_id}_{number}', 'email': f'load{self._run_id}_{number}@example.com',
+                'password': 'bench-password', 'firstname': 'Load', 'lastname': 'Test'}
+
+    def new_user(self):
+        from api.models.blogmodels import db, User
+
+        with self.app.app_context():
+            data = self.new_user_data()
+            user = User(**data)
+            db.session.add(user)
+            db.session.commit()
+            return str(user.id)
+
+    def new_comment(self):
+        from api.models.blogmodels import db, Comment
+        from api.utils.counters import comments_added
+        from api.utils.cache import to_uuid
+
+        with self.app.app_context():
+            comment = Comment(blog_post_id=to_uuid(self.pick('posts')), user_id=to_uuid(self.user_id),
+                              comment='Load test')
+            db.session.add(comment)
+            comments_added(comment.blog_post_id)
+            db.session.commit()
+            return str(comment.id)
+
+
+def resolve(value, ctx):
+    return value(ctx) if callable(value) else value
+
+
+def run_scenario(app, ctx, counter, scenario, requests, concurrency):
+    # Prepared rows are made up front, so creating them is neither timed nor counted
+    prepared = [scenario.prepare(ctx) if scenario.prepare else None for _ in range(requests)]
+    calls = []
+    for index in range(requests):
+        ctx.prepared = prepared[index]
+        calls.append((resolve(scenario.path, ctx), resolve(scenario.body, ctx)))
+
+    def request(call):
+        path, body = call
+        with app.test_client() as client:
+            counter.reset()
+            started = time.perf_counter()
+            response = client.open(path, method=scenario.method, json=body, headers=ctx.headers)
+            response.get_data()
+            return time.perf_counter() - started, counter.count, response.status_code
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        outcomes = list(pool.map(request, calls))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in outcomes)
+    statuses = {}
+    for _, _, status in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, _, status in outcomes if status not in scenario.expect),
+        'statuses': statuses,
+        'throughput': round(requests / elapsed, 2),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'queries_per_request': round(sum(queries for _, queries, _ in outcomes) / requests, 2)
+    }
+
+
+def percentile(ordered, fraction):
+    return round(ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] * 1000, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Print p95 and throughput changes against a stored run; returns the regressed scenarios."""
+    regressed = []
+    print(f'\nagainst {baseline.get("commit") or "baseline"} ({baseline["started_at"]}):')
+    for name, result in results.items():
+        before = baseline['results'].get(name)
+        if not before:
+            continue
+        change = (result['p95_ms'] - before['p95_ms']) / before['p95_ms'] if before['p95_ms'] else 0.0
+        flag = '  REGRESSION' if change > threshold else ''
+        print(f'  {name:<22} p95 {before["p95_ms"]:8.1f} -> {result["p95_ms"]:8.1f} ms ({change:+.0%})  '
+              f'{before["throughput"]:8.1f} -> {result["throughput"]:8.1f} req/sec{flag}')
+        if flag:
+            regressed.append(name)
+    return regressed
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--requests', type=int, default=200, help='requests per scenario')
+    parser.add_argument('--only', nargs='+', choices=[scenario.name for scenario in SCENARIOS],
+                        help='scenarios to run (default: all)')
+    parser.add_argument('--seed', action='store_true', help='seed generated rows first (implied without DATABASE_URL)')
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='p95 increase counted as a regression')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "load-benchmark.db")}'
+        args.seed = True
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-of-sufficient-length')
+    os.environ.pop('FLASK_ENV', None)
+
+    from api.app import app
+    from benchmarks.seed import seed
+
+    if args.seed:
+        with app.app_context():
+            seed(args.users, args.posts, args.comments)
+
+    counter = QueryCounter()
+    counter.install()
+    ctx = Context(app)
+    scenarios = [scenario for scenario in SCENARIOS if not args.only or scenario.name in args.only]
+
+    run = {
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'database': app.config['SQLALCHEMY_DATABASE_URI'].split(':', 1)[0],
+        'concurrency': args.concurrency,
+        'results': {}
+    }
+    print(f'{run["database"]}, concurrency {args.concurrency}')
+    print(f'  {"scenario":<22} {"req/sec":>9} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"queries":>8} errors')
+    for scenario in scenarios:
+        requests = min(args.requests, scenario.max_requests or args.requests)
+        result = run['results'][scenario.name] = run_scenario(app, ctx, counter, scenario, requests,
+                                                              args.concurrency)
+        print(f'  {scenario.name:<22} {result["throughput"]:9.1f} {result["p50_ms"]:9.1f} {result["p95_ms"]:9.1f} '
+              f'{result["p99_ms"]:9.1f} {result["queries_per_request"]:8.1f} {result["errors"]}')
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w') as output:
+            json.dump(run, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            if compare(run['results'], json.load(baseline), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
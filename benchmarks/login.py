@@ -0,0 +1,84 @@
+"""Login throughput with passwords hashed inline versus in the hashing pool.
+
+Runs POST /api/v1/login concurrently against a throwaway SQLite database:
+
+    python -m benchmarks.login --requests 200 --concurrency 50 --workers 0 4
+    python -m benchmarks.login --gevent   # greenlets, as under gunicorn's gevent worker
+
+Inline hashing under --gevent serializes every login in the worker; with the
+pool, logins overlap up to PASSWORD_HASH_WORKERS at a time.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 4],
+                        help='PASSWORD_HASH_WORKERS values to compare (0 = inline)')
+    parser.add_argument('--method', default='scrypt', help='PASSWORD_HASH_METHOD')
+    parser.add_argument('--gevent', action='store_true', help='monkey-patch with gevent and use greenlets')
+    return parser.parse_args()
+
+
+def run(app, requests, concurrency, use_gevent):
+    def login(_):
+        started = time.perf_counter()
+        with app.test_client() as client:
+            response = client.post('/api/v1/login', json={'identifier': 'bench', 'password': 'bench-password'})
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    if use_gevent:
+        from gevent.pool import Pool
+        latencies = list(Pool(concurrency).imap_unordered(login, range(requests)))
+    else:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(login, range(requests)))
+    return requests / (time.perf_counter() - started), latencies
+
+
+def main():
+    args = parse_args()
+    if args.gevent:
+        from gevent import monkey
+        monkey.patch_all()
+
+    database = os.path.join(tempfile.mkdtemp(), 'login-benchmark.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    os.environ.setdefault('SECRET_KEY', 'benchmark-secret-key-of-sufficient-length')
+    os.environ.pop('FLASK_ENV', None)
+
+    from api.app import app
+    from api.models.blogmodels import db, User
+    from api.utils.passwords import password_hasher
+
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com', firstname='Bench', lastname='Mark')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+
+    print(f'{args.requests} logins, concurrency {args.concurrency}, {args.method}, '
+          f'{"gevent" if args.gevent else "threads"}')
+    for workers in args.workers:
+        password_hasher.workers = workers
+        password_hasher._pool = None
+        throughput, latencies = run(app, args.requests, args.concurrency, args.gevent)
+        latencies.sort()
+        print(f'  workers={workers:<3} {throughput:8.1f} logins/sec  '
+              f'p50 {statistics.median(latencies) * 1000:7.1f} ms  '
+              f'p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
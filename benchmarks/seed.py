@@ -0,0 +1,164 @@
+"""Fill a database with generated users, posts and comments for load tests.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.seed --users 100000 --posts 1000000 --comments 10000000
+
+Rows are streamed in batches with COPY FROM STDIN on Postgres and executemany
+INSERTs elsewhere, so memory use does not grow with the volume. Every user's
+password is `bench-password` (hashed once). Ids are derived from the row
+number, so a seed with the same volumes always produces the same rows, and
+comment counters are repaired at the end as the app would keep them.
+"""
+import argparse
+import hashlib
+import io
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+
+PASSWORD = 'bench-password'
+# Spread created_at over the year before SEED_EPOCH
+SEED_EPOCH = datetime(2024, 1, 1)
+SPAN = timedelta(days=365)
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut '
+         'labore et dolore magna aliqua postgres flask python index query cache latency').split()
+
+
+def row_id(table, number):
+    """Deterministic, randomly distributed version 4 UUID of row `number` of `table`."""
+    return uuid.UUID(bytes=hashlib.md5(f'{table}:{number}'.encode()).digest(), version=4)
+
+
+def created_at(number, total):
+    return SEED_EPOCH - SPAN + SPAN * (number / max(total, 1))
+
+
+def skewed(rng, total):
+    # A few posts get most of the comments, like on a real blog
+    return int(total * rng.random() ** 2)
+
+
+def generate_users(count, password_hash):
+    for number in range(count):
+        yield {
+            'id': row_id('users', number),
+            'username': f'user{number}',
+            'email': f'user{number}@example.com',
+            'password': password_hash,
+            'firstname': f'First{number}',
+            'lastname': f'Last{number}',
+            'created_at': created_at(number, count),
+            # user0 administers, so load tests can reach admin-only routes
+            'role': 'admin' if number == 0 else 'author',
+            'is_active': True
+        }
+
+
+def generate_posts(count, users, rng):
+    from api.models.blogmodels import make_excerpt
+
+    for number in range(count):
+        content = ' '.join(rng.choices(WORDS, k=rng.randint(50, 400)))
+        yield {
+            'id': row_id('blog_posts', number),
+            'title': ' '.join(rng.choices(WORDS, k=6)).capitalize(),
+            'content': content,
+            'excerpt': make_excerpt(content),
+            'author_id': row_id('users', rng.randrange(users)),
+            'created_at': created_at(number, count),
+            'comment_count': 0
+        }
+
+
+def generate_comments(count, users, posts, rng):
+    for number in range(count):
+        comment_id = row_id('comments', number)
+        yield {
+            'id': comment_id,
+            'blog_post_id': row_id('blog_posts', skewed(rng, posts)),
+            'user_id': row_id('users', rng.randrange(users)),
+            'comment': ' '.join(rng.choices(WORDS, k=rng.randint(5, 40))),
+            'created_at': created_at(number, count),
+            # Top-level comments; COPY skips the model's Python-side path default
+            'path': comment_id.hex + '/',
+            'depth': 0
+        }
+
+
+def batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def copy_rows(connection, table, batch):
+    """COPY one batch into a Postgres table; generated text has no tabs or newlines."""
+    columns = list(batch[0])
+    buffer = io.StringIO()
+    for row in batch:
+        buffer.write('\t'.join(r'\N' if row[column] is None else str(row[column]) for column in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(f'COPY {table.name} ({", ".join(columns)}) FROM STDIN', buffer)
+
+
+def load_table(engine, table, rows, batch_size, report):
+    copy = engine.dialect.name == 'postgresql'
+    loaded = 0
+    started = time.perf_counter()
+    for batch in batches(rows, batch_size):
+        with engine.begin() as connection:
+            if copy:
+                copy_rows(connection, table, batch)
+            else:
+                connection.execute(insert(table), batch)
+        loaded += len(batch)
+        report(f'{table.name}: {loaded} rows, {loaded / (time.perf_counter() - started):.0f} rows/sec')
+    return loaded
+
+
+def seed(users, posts, comments, batch_size=10000, random_seed=0, report=print):
+    """Create the tables if needed and load the generated rows; call inside an app context."""
+    from api.models.blogmodels import db, User, BlogPost, Comment
+    from api.utils.counters import repair_comment_counts
+    from api.utils.passwords import password_hasher
+
+    rng = random.Random(random_seed)
+    db.create_all()
+    load_table(db.engine, User.__table__, generate_users(users, password_hasher.hash(PASSWORD)), batch_size, report)
+    load_table(db.engine, BlogPost.__table__, generate_posts(posts, users, rng), batch_size, report)
+    load_table(db.engine, Comment.__table__, generate_comments(comments, users, posts, rng), batch_size, report)
+
+    report(f'repaired counters on {repair_comment_counts(batch_size)} posts')
+    if db.engine.dialect.name == 'postgresql':
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            connection.exec_driver_sql('ANALYZE')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--posts', type=int, default=10000)
+    parser.add_argument('--comments', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=10000, help='rows per COPY or executemany')
+    parser.add_argument('--seed', type=int, default=0, help='random seed for the generated content')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    from api.app import app
+
+    with app.app_context():
+        seed(args.users, args.posts, args.comments, args.batch_size, args.seed)
+
+
+if __name__ == '__main__':
+    main()
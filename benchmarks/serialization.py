@@ -0,0 +1,69 @@
+"""Rows/sec for serializing pages of blog posts to JSON response bytes.
+
+Compares the marshmallow schema the routes used to call with the compiled
+serializers, under both the default and the orjson JSON providers:
+
+    python -m benchmarks.serialization --rows 100 10000
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from api.models.blogmodels import BlogPost
+from api.schemas.blogschema import BlogPostSchema
+from api.schemas.serializers import post_serializer
+
+
+def make_posts(count):
+    now = datetime(2024, 8, 1)
+    author_id = uuid.uuid4()
+    return [BlogPost(id=uuid.uuid4(), title=f'Post {i}', content='Lorem ipsum dolor sit amet. ' * 40,
+                     author_id=author_id, created_at=now - timedelta(minutes=i), updated_at=None,
+                     comment_count=i % 17, last_comment_at=now)
+            for i in range(count)]
+
+
+def candidates(app):
+    providers = {'json': DefaultJSONProvider(app)}
+    try:
+        from api.utils.fastjson import OrjsonProvider
+        providers['orjson'] = OrjsonProvider(app)
+    except ImportError:
+        pass
+
+    schema = BlogPostSchema(many=True)
+    for name, provider in providers.items():
+        yield f'marshmallow + {name}', lambda posts, provider=provider: provider.dumps({'posts': schema.dump(posts)})
+        yield f'serializer + {name}', \
+            lambda posts, provider=provider: provider.dumps({'posts': post_serializer.dump_many(posts)})
+
+
+def measure(function, posts, min_time):
+    runs = 0
+    started = time.perf_counter()
+    while True:
+        function(posts)
+        runs += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return runs * len(posts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 10000], help='page sizes to measure')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds to run each measurement')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    for rows in args.rows:
+        posts = make_posts(rows)
+        print(f'{rows} rows per page')
+        for name, function in candidates(app):
+            print(f'  {name:<22} {measure(function, posts, args.min_time):>12,.0f} rows/sec')
+
+
+if __name__ == '__main__':
+    main()
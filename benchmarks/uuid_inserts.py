@@ -0,0 +1,89 @@
+"""Insert rate and primary key index size with version 4 versus version 7 UUID keys.
+
+Loads the same rows into two scratch tables keyed by uuid4() and uuid7() ids
+and reports, after every --step rows, the insert rate of the last step and
+the size of the primary key index:
+
+    DATABASE_URL=postgresql://... python -m benchmarks.uuid_inserts --rows 10000000 --step 1000000
+
+Random v4 keys insert into random leaf pages of the index, so once it
+outgrows shared_buffers the rate drops and pages split half full; v7 keys
+append at the right edge. Without DATABASE_URL a throwaway SQLite file is
+used, which shows the rate but not the index size. The tables are dropped
+at the end.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import Column, DateTime, MetaData, Table, Text, create_engine, insert
+from sqlalchemy.dialects.postgresql import UUID
+from api.utils.ids import uuid7
+
+GENERATORS = {'v4': uuid4, 'v7': uuid7}
+
+
+def scratch_table(metadata, version):
+    return Table(f'bench_uuid_{version}', metadata,
+                 Column('id', UUID(as_uuid=True), primary_key=True),
+                 Column('created_at', DateTime, nullable=False),
+                 Column('body', Text, nullable=False))
+
+
+def index_size(connection, table):
+    if connection.dialect.name != 'postgresql':
+        return None
+    return connection.exec_driver_sql(
+        f"SELECT pg_relation_size('{table.name}_pkey')").scalar()
+
+
+def load(engine, table, generate, rows, step, batch_size):
+    """Yield (rows so far, rows/sec over the last step, index bytes) after every step."""
+    loaded = 0
+    while loaded < rows:
+        started, before = time.perf_counter(), loaded
+        target = min(loaded + step, rows)
+        while loaded < target:
+            count = min(batch_size, target - loaded)
+            batch = [{'id': generate(), 'created_at': datetime.now(), 'body': 'comment text'}
+                     for _ in range(count)]
+            with engine.begin() as connection:
+                connection.execute(insert(table), batch)
+            loaded += count
+        rate = (loaded - before) / (time.perf_counter() - started)
+        with engine.connect() as connection:
+            yield loaded, rate, index_size(connection, table)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--step', type=int, default=100000, help='rows between reports')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per executemany')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    url = os.environ.get('DATABASE_URL') or f'sqlite:///{os.path.join(tempfile.mkdtemp(), "uuid-benchmark.db")}'
+    engine = create_engine(url)
+    metadata = MetaData()
+    tables = {version: scratch_table(metadata, version) for version in GENERATORS}
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    try:
+        for version, generate in GENERATORS.items():
+            print(f'{version}:')
+            for loaded, rate, size in load(engine, tables[version], generate, args.rows, args.step,
+                                           args.batch_size):
+                size = f'{size / 2 ** 20:9.1f} MiB index' if size is not None else ''
+                print(f'  {loaded:>11,} rows  {rate:10.0f} rows/sec  {size}')
+    finally:
+        metadata.drop_all(engine)
+
+
+if __name__ == '__main__':
+    main()
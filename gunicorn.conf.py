@@ -0,0 +1,20 @@
+# Loaded by gunicorn from the working directory. Imports stay inside the
+# hooks: gevent workers monkey-patch after the master has forked them, so
+# anything the master imports up front (ssl via flask) would be unpatched.
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples left by the previous run's workers would be added to this one's
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory)
+
+
+def child_exit(server, worker):
+    # Stop counting an exited worker's connections in the Prometheus pool gauge
+    from api.utils.metrics import mark_worker_dead
+
+    mark_worker_dead(worker.pid)